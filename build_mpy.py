@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+# Precompile lib/touchscreen to .mpy so the board skips compiling it at boot.
+# mpy-cross must match the board's CircuitPython major version; get it from
+# https://adafruit-circuit-python.s3.amazonaws.com/index.html?prefix=bin/mpy-cross/
+# --deploy also compiles layouts/*.json into zone tables (layout_compiler.py)
+# and copies them next to code.py.
+#
+#   python build_mpy.py                              # build into build/lib
+#   python build_mpy.py --deploy /media/CIRCUITPY --entry code_keyboard.py
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+
+import layout_compiler
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PACKAGE = "touchscreen"
+
+
+def compile_package(mpy_cross, output_dir):
+    source_dir = os.path.join(ROOT, "lib", PACKAGE)
+    target_dir = os.path.join(output_dir, PACKAGE)
+    os.makedirs(target_dir, exist_ok=True)
+    total_source = 0
+    total_mpy = 0
+    for name in sorted(os.listdir(source_dir)):
+        if not name.endswith(".py"):
+            continue
+        source = os.path.join(source_dir, name)
+        target = os.path.join(target_dir, name[:-3] + ".mpy")
+        subprocess.run([mpy_cross, "-o", target, source], check=True)
+        source_size = os.path.getsize(source)
+        mpy_size = os.path.getsize(target)
+        total_source += source_size
+        total_mpy += mpy_size
+        print(f"  {name:28} {source_size:6} -> {mpy_size:6} bytes")
+    print(f"Compiled {PACKAGE}: {total_source} bytes of source -> {total_mpy} bytes of .mpy")
+    return target_dir
+
+
+def compile_zone_tables(output_dir):
+    """Compile every layout; returns the table paths, or None if any layout has errors"""
+    tables = [layout_compiler.compile_layout(path, output_dir) for path in layout_compiler.layout_paths()]
+    return None if None in tables else tables
+
+
+def deploy(package_dir, drive, entry, tables):
+    target_dir = os.path.join(drive, "lib", PACKAGE)
+    # The board imports a .py ahead of an .mpy of the same name, so drop old sources
+    if os.path.isdir(target_dir):
+        shutil.rmtree(target_dir)
+    shutil.copytree(package_dir, target_dir)
+    print(f"Copied {PACKAGE} to {target_dir}")
+    shutil.copy(os.path.join(ROOT, "boot.py"), os.path.join(drive, "boot.py"))
+    for table in tables:
+        shutil.copy(table, drive)
+        print(f"Copied {os.path.basename(table)} to {drive}")
+    if entry:
+        shutil.copy(os.path.join(ROOT, entry), os.path.join(drive, "code.py"))
+        print(f"Copied {entry} to {os.path.join(drive, 'code.py')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Precompile lib/{PACKAGE} with mpy-cross")
+    parser.add_argument("--mpy-cross", default=shutil.which("mpy-cross"), help="path to the mpy-cross binary")
+    parser.add_argument("--output", default=os.path.join(ROOT, "build", "lib"), help="build directory")
+    parser.add_argument("--deploy", metavar="CIRCUITPY", help="copy the build and boot.py to a mounted board")
+    parser.add_argument("--entry", help="entry script to install as code.py with --deploy, e.g. code_keyboard.py")
+    args = parser.parse_args()
+
+    if not args.mpy_cross:
+        print("mpy-cross not found; put it on PATH or pass --mpy-cross", file=sys.stderr)
+        return 1
+    try:
+        package_dir = compile_package(args.mpy_cross, args.output)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"mpy-cross failed: {e}", file=sys.stderr)
+        return 1
+    if args.deploy:
+        tables = compile_zone_tables(os.path.dirname(os.path.abspath(args.output)))
+        if tables is None:
+            print("Not deploying: fix the layout errors above", file=sys.stderr)
+            return 1
+        deploy(package_dir, args.deploy, args.entry, tables)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,5 +1,6 @@
 import time
 import usb_hid
+from touchscreen.joystick import BUTTON_COUNT, BUTTON_OFFSET, joystick_report
 
 # Find our custom joystick device
 custom_joystick = None
@@ -17,25 +18,9 @@ def test_button(button_num):
     """Test a specific button"""
     print(f"Testing button {button_num}...")
     
-    # Create joystick report: Report ID + X + Y + 16 buttons
-    report = bytearray(5)
-    report[0] = 4    # Report ID
-    report[1] = 0x80 # X axis center (128)
-    report[2] = 0x80 # Y axis center (128)
-    
-    if button_num <= 8:
-        # Buttons 1-8 in third byte
-        report[3] = 1 << (button_num - 1)
-        report[4] = 0
-        print(f"Button {button_num}: report[3]=0x{report[3]:02x}, report[4]=0x{report[4]:02x}")
-    elif button_num <= 16:
-        # Buttons 9-16 in fourth byte  
-        report[3] = 0
-        report[4] = 1 << (button_num - 9)
-        print(f"Button {button_num}: report[3]=0x{report[3]:02x}, report[4]=0x{report[4]:02x}")
-    else:
-        print(f"ERROR: Invalid button number {button_num}")
-        return
+    # Same report layout boot.py declares: Report ID + X + Y + BUTTON_COUNT buttons
+    report = joystick_report((button_num,))
+    print(f"Button {button_num}: buttons=" + " ".join(f"0x{b:02x}" for b in report[BUTTON_OFFSET:]))
     
     try:
         # Send button press
@@ -44,9 +29,7 @@ def test_button(button_num):
         time.sleep(0.1)
         
         # Send button release
-        report[3] = 0
-        report[4] = 0
-        custom_joystick.send_report(report)
+        custom_joystick.send_report(joystick_report())
         print(f"Sent button {button_num} release")
         time.sleep(0.1)
         
@@ -54,7 +37,7 @@ def test_button(button_num):
         print(f"Error sending button {button_num}: {e}")
 
 # Test all buttons
-for i in range(1, 17):
+for i in range(1, BUTTON_COUNT + 1):
     test_button(i)
     time.sleep(0.5)
 
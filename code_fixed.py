@@ -1,11 +1,33 @@
-import time
+# Started first so the startup time includes loading everything below
+from touchscreen.startup import StartupTimer
+startup = StartupTimer("code_fixed")
+
 import usb.core
-import usb.util
 import usb_hid
-import adafruit_usb_host_descriptors
 import supervisor
+import usb_cdc
+from touchscreen.adaptive_polling import AdaptivePolling
+from touchscreen.axis_zones import AXIS_X, AXIS_Y, AxisState, find_axis_zone, slider, stick
+from touchscreen.connection_supervisor import ConnectionSupervisor
+from touchscreen.control_channel import (ControlChannel, Histogram, PARAM_AXIS_INTERVAL, PARAM_HOLD_MODE,
+                                         PARAM_IDLE_AFTER, PARAM_REPEAT_DELAY, PARAM_TOUCH_TIMEOUT,
+                                         PARAM_ZONE_HYSTERESIS)
+from touchscreen.gc_scheduler import GCScheduler
+from touchscreen.held_keys import HeldButtons, HeldKeyboard
+from touchscreen.joystick import BUTTON_COUNT, joystick_report
+from touchscreen.macro_engine import MacroScheduler, compile_tap
+from touchscreen.pipeline import DecodeStage, Pipeline, Stage, StageTimings, ZoneStage
+from touchscreen.profile import load_decoder
+from touchscreen.timing import NS_PER_MS, NS_PER_US, ms, now_ns, ticks_diff, ticks_elapsed
+from touchscreen.touch import ZoneTracker
+from touchscreen.usb_discovery import find_touchscreen_and_endpoint, set_idle
+from touchscreen.zone_table import KIND_BUTTONS, load_zone_table
 supervisor.runtime.autoreload = False
 
+# Print the full zone table and HID device list at startup; off by default
+# because printing it all delays a cold start
+VERBOSE_STARTUP = False
+
 # Find our custom joystick device
 custom_joystick = None
 available_device = None
@@ -13,7 +35,8 @@ print("Checking for custom joystick device...")
 print(f"Total HID devices available: {len(usb_hid.devices)}")
 
 for device in usb_hid.devices:
-    print(f"Found USB HID device: usage_page={device.usage_page:02x}, usage={device.usage:02x}")
+    if VERBOSE_STARTUP:
+        print(f"Found USB HID device: usage_page={device.usage_page:02x}, usage={device.usage:02x}")
     # Save the first available device as fallback
     if not available_device:
         available_device = device
@@ -32,86 +55,46 @@ if not custom_joystick:
     else:
         print("No HID devices available at all!")
 
-# Touch zone mappings: (x1, y1, x2, y2, button_num, button_name)
-# 16 buttons for gamepad compatibility
-# 16 evenly spaced sections using actual coordinate ranges (300-3800)
-# Grid: 4x4 layout, each section is 875x875 pixels
-TOUCH_ZONES = [
-    (300, 300, 1175, 1175, 1, "Button1"),     # Row 1, Col 1
-    (1175, 300, 2050, 1175, 2, "Button2"),    # Row 1, Col 2
-    (2050, 300, 2925, 1175, 3, "Button3"),    # Row 1, Col 3
-    (2925, 300, 3800, 1175, 4, "Button4"),    # Row 1, Col 4
-    (300, 1175, 1175, 2050, 5, "Button5"),    # Row 2, Col 1
-    (1175, 1175, 2050, 2050, 6, "Button6"),   # Row 2, Col 2
-    (2050, 1175, 2925, 2050, 7, "Button7"),   # Row 2, Col 3
-    (2925, 1175, 3800, 2050, 8, "Button8"),   # Row 2, Col 4
-    (300, 2050, 1175, 2925, 9, "Button9"),    # Row 3, Col 1
-    (1175, 2050, 2050, 2925, 10, "Button10"), # Row 3, Col 2
-    (2050, 2050, 2925, 2925, 11, "Button11"), # Row 3, Col 3
-    (2925, 2050, 3800, 2925, 12, "Button12"), # Row 3, Col 4
-    (300, 2925, 1175, 3800, 13, "Button13"),  # Row 4, Col 1
-    (1175, 2925, 2050, 3800, 14, "Button14"), # Row 4, Col 2
-    (2050, 2925, 2925, 3800, 15, "Button15"), # Row 4, Col 3
-    (2925, 2925, 3800, 3800, 16, "Button16"), # Row 4, Col 4
-]
-
-# Touchscreen resolution (updated to actual coordinate range)
-SCREEN_WIDTH = 3800
-SCREEN_HEIGHT = 3800
-
-# HID class constants
-HID_CLASS = 0x03
-HID_SUBCLASS = 0x00
-HID_PROTOCOL = 0x00
-
-def find_touchscreen_and_endpoint():
-    print("Scanning for USB devices...")
-    device_count = 0
-    
-    for device in usb.core.find(find_all=True):
-        device_count += 1
-        try:
-            print(f"Device {device_count}: VID:{device.idVendor:04x} PID:{device.idProduct:04x}")
-            if hasattr(device, 'product') and device.product:
-                print(f"  Product: {device.product}")
-            
-            config_descriptor = adafruit_usb_host_descriptors.get_configuration_descriptor(device, 0)
-            i = 0
-            touchscreen_interface = None
-            endpoint_addr = None
-            
-            while i < len(config_descriptor):
-                descriptor_len = config_descriptor[i]
-                descriptor_type = config_descriptor[i + 1]
-                
-                if descriptor_type == adafruit_usb_host_descriptors.DESC_INTERFACE:
-                    interface_class = config_descriptor[i + 5]
-                    interface_subclass = config_descriptor[i + 6]
-                    interface_protocol = config_descriptor[i + 7]
-                    print(f"  Interface: Class={interface_class:02x} Sub={interface_subclass:02x} Proto={interface_protocol:02x}")
-                    
-                    if interface_class == HID_CLASS:
-                        print(f"  -> Found HID interface!")
-                        touchscreen_interface = config_descriptor[i + 2]
-                        
-                elif descriptor_type == adafruit_usb_host_descriptors.DESC_ENDPOINT and touchscreen_interface is not None:
-                    endpoint_address = config_descriptor[i + 2]
-                    if endpoint_address & 0x80:  # Input endpoint
-                        endpoint_addr = endpoint_address
-                        max_packet_size = config_descriptor[i + 4]
-                        print(f"  -> Found input endpoint: {endpoint_addr:02x}, packet size: {max_packet_size}")
-                        return device, endpoint_addr, max_packet_size
-                        
-                i += descriptor_len
-        except Exception as e:
-            print(f"Error checking device {device_count}: {e}")
-            continue
-    
-    print(f"Scanned {device_count} devices, no suitable touchscreen found")
-    return None, None, None
+# Touch zone mappings, read like a list of (x1, y1, x2, y2, button_num, button_name).
+# Edited in layouts/fixed.json (a 4x4 grid of buttons 1-16 over 300-3800) and
+# compiled with layout_compiler.py into fixed.zones, which goes next to code.py
+# on the board. Buttons run 1-BUTTON_COUNT (lib/touchscreen/joystick.py).
+ZONE_TABLE_PATH = "fixed.zones"
+TOUCH_ZONES = load_zone_table(ZONE_TABLE_PATH, KIND_BUTTONS)
+
+# Axis zones drive the joystick X/Y axes from the touch position and are
+# checked before the button zones. Sliders keep their value on release,
+# sticks spring back to center. The 300 unit margins around the button grid
+# are free, e.g.:
+#   slider(300, 0, 3800, 300, AXIS_X, "X Slider")
+#   slider(0, 300, 300, 3800, AXIS_Y, "Y Slider")
+# or give up some buttons for a thumbstick:
+#   stick(300, 2050, 2050, 3800, "Stick")
+AXIS_ZONES = []
+
+# Report layout and calibration from diagnostic_code.py's corner-touch detection,
+# if a touch_profile.json has been saved; otherwise the built-in decoding
+touch_decoder = load_decoder(list(TOUCH_ZONES) + [(zone.x1, zone.y1, zone.x2, zone.y2) for zone in AXIS_ZONES])
+
+def compile_button_taps():
+    """Precompile a press/release tap for every button so sending one never sleeps"""
+    taps = [None]
+    for button_num in range(1, BUTTON_COUNT + 1):
+        if custom_joystick.usage == 0x04:
+            # Joystick report: Report ID + X + Y + one bit per button
+            press = joystick_report((button_num,))
+            release = joystick_report()
+            taps.append(compile_tap(f"Button{button_num}", custom_joystick, press, release, ms(50)))
+        else:
+            # Fallback keyboard mode - Button N = keycode N + 3: A-Z for Buttons 1-26,
+            # then the digit row (Button 27 = keycode 30 (1)) and on up the keycode table
+            press = bytearray(8)
+            press[2] = button_num + 3
+            taps.append(compile_tap(f"Button{button_num}", custom_joystick, press, bytearray(8), ms(10)))
+    return taps
 
 def send_button_press(button_num):
-    """Send a button press through custom joystick or fallback to keyboard"""
+    """Send a button tap through custom joystick or fallback to keyboard"""
     if not button_num:
         print("ERROR: Cannot send button - button_num is None or 0")
         return
@@ -119,154 +102,308 @@ def send_button_press(button_num):
     if not custom_joystick:
         print("ERROR: Cannot send button - no HID device available")
         return
-
-    # Check if this is our custom joystick (usage 0x04) or fallback keyboard (usage 0x06)
-    if custom_joystick.usage == 0x04:
-        # Custom joystick mode
-        print(f"Sending joystick button {button_num}...")
-        try:
-            # Create joystick report: Report ID + X + Y + 16 buttons
-            report = bytearray(5)
-            report[0] = 4    # Report ID
-            report[1] = 0x80 # X axis center (128)
-            report[2] = 0x80 # Y axis center (128)
-            
-            if button_num <= 8:
-                # Buttons 1-8 in third byte
-                report[3] = 1 << (button_num - 1)
-                report[4] = 0
-            elif button_num <= 16:
-                # Buttons 9-16 in fourth byte  
-                report[3] = 0
-                report[4] = 1 << (button_num - 9)
-            else:
-                print(f"ERROR: Invalid button number {button_num}, must be 1-16")
-                return
-            
-            # Send button press
-            custom_joystick.send_report(report)
-            time.sleep(0.05)
-            
-            # Send button release
-            report[3] = 0
-            report[4] = 0
-            custom_joystick.send_report(report)
-            time.sleep(0.01)
-            
-            print(f"Successfully sent joystick button {button_num}")
-        except Exception as e:
-            print(f"Error sending joystick button {button_num}: {e}")
-    else:
-        # Fallback keyboard mode - map buttons to keys A-P
-        print(f"Sending button {button_num} as keyboard key...")
-        try:
-            keycode = button_num + 3  # Button 1 = keycode 4 (A), Button 16 = keycode 19 (P)
-            
-            # Key press
-            report = bytearray(8)
-            report[2] = keycode
-            custom_joystick.send_report(report)
-            time.sleep(0.01)
-            
-            # Key release
-            report[2] = 0
-            custom_joystick.send_report(report)
-            time.sleep(0.01)
-            print(f"Successfully sent button {button_num} as key {chr(ord('A') + button_num - 1)}")
-        except Exception as e:
-            print(f"Error sending button {button_num}: {e}")
-
-def parse_touchscreen_report(data):
-    """Parse touchscreen HID report to extract touch state and coordinates"""
-    if len(data) < 6:
-        return False, 0, 0
     
-    touch_state = data[1] > 0
-    x = data[2] | (data[3] << 8)
-    y = data[4] | (data[5] << 8)
-    
-    scaled_x = x
-    scaled_y = y
+    if button_num > BUTTON_COUNT:
+        print(f"ERROR: Invalid button number {button_num}, must be 1-{BUTTON_COUNT}")
+        return
     
-    if scaled_x > SCREEN_WIDTH:
-        scaled_x = int((x / 4096.0) * SCREEN_WIDTH)
-    if scaled_y > SCREEN_HEIGHT:
-        scaled_y = int((y / 3072.0) * SCREEN_HEIGHT)
-    return bool(touch_state), scaled_x, scaled_y
-
-def find_touch_zone(x, y):
-    """Check if coordinates fall within any defined touch zone"""
-    for zone in TOUCH_ZONES:
-        x1, y1, x2, y2, button_num, button_name = zone
-        if x1 <= x < x2 and y1 <= y < y2:
-            return button_num, button_name
-    return None, None
+    macro_scheduler.start(button_taps[button_num])
+
+def hold_button(button_num):
+    """Release the held button, then hold button_num (None just releases)"""
+    global last_button
+    if button_num == last_button or not held_buttons:
+        return
+    released = button_codes(last_button) if last_button else ()
+    last_button = button_num
+    if button_num:
+        # A tap still playing on the device would overwrite the held button
+        macro_scheduler.cancel_device(held_buttons.device)
+        # Sliding between zones swaps the buttons in one report
+        held_buttons.replace(released, button_codes(button_num))
+    elif released:
+        held_buttons.release(released)
+
+def button_codes(button_num):
+    """Held codes for a button: the button itself, or its keycode on the fallback keyboard"""
+    if custom_joystick.usage == 0x04:
+        return (button_num,)
+    return (button_num + 3,)
 
 # Global variables for touch state tracking
-last_touch_state = False
 last_button = None
-last_touch_time = 0
-REPEAT_DELAY = 0.5  # Time between repeated button presses in seconds
+# Times are integer nanoseconds (see lib/touchscreen/timing.py)
+REPEAT_DELAY = ms(500)  # Time between repeated button presses
+# Hold mode: button down on contact, up on release or TOUCH_TIMEOUT, instead of a 50ms pulse
+HOLD_MODE = False
+TOUCH_TIMEOUT = ms(100)  # Release held button if no touch reports for 100ms
+AXIS_INTERVAL = ms(20)  # Minimum time between reports for each axis
+IDLE_AFTER = ms(2000)  # Drop to slow polling once the screen has been untouched this long
+ZONE_HYSTERESIS = 40  # A contact keeps its button until it is this many units past the zone's edge
+STAGE_TIMING = False  # Per-stage "<stage>_us" histograms on the control channel; two clock reads per stage
+macro_scheduler = MacroScheduler()
+polling = AdaptivePolling(idle_after=IDLE_AFTER)
+zone_tracker = ZoneTracker(TOUCH_ZONES, ZONE_HYSTERESIS)
+button_taps = compile_button_taps() if custom_joystick else []
+held_buttons = None
+if custom_joystick:
+    held_buttons = HeldButtons(custom_joystick) if custom_joystick.usage == 0x04 else HeldKeyboard(custom_joystick)
+axis_state = None
+if AXIS_ZONES and isinstance(held_buttons, HeldButtons):
+    tap_reports = []
+    for tap in button_taps[1:]:
+        tap_reports.extend(tap.reports)
+    axis_state = AxisState(held_buttons, AXIS_INTERVAL, tap_reports, macro_scheduler)
+elif AXIS_ZONES:
+    print("ERROR: Axis zones need the custom joystick device - ignoring them")
+connected_touchscreen = None  # (device, endpoint) while reading, so SET_IDLE can follow TOUCH_TIMEOUT
+reports_processed = 0
+buttons_sent = 0
+report_histogram = Histogram("report_us")
 
-def process_touch_report(data):
-    """Process touchscreen report and send appropriate button press"""
-    global last_touch_state, last_button, last_touch_time
-    
-    touched, x, y = parse_touchscreen_report(data)
-    current_time = time.monotonic()
-    
-    if touched:
-        button_num, button_name = find_touch_zone(x, y)
-        if button_num:
-            # Send button on initial touch or after repeat delay
-            if (not last_touch_state or 
-                button_num != last_button or 
-                current_time - last_touch_time >= REPEAT_DELAY):
-                print(f"Touch detected at ({x}, {y}) -> Sending button '{button_name}'")
-                send_button_press(button_num)
-                last_button = button_num
-                last_touch_time = current_time
-        else:
-            print(f"Touch detected at ({x}, {y}) -> No zone mapped")
-    
-    last_touch_state = touched
-    return touched
+class AxisAction(Stage):
+    """Drives the joystick axes while the contact is on an axis zone; button zones only see other touches"""
+
+    __slots__ = ("active",)
+
+    def __init__(self):
+        super().__init__("axis")
+        self.active = None
+
+    def process(self, contact):
+        x = contact.x
+        y = contact.y
+        axis_zone = find_axis_zone(AXIS_ZONES, x, y) if contact.touched else None
+        if axis_zone is not self.active:
+            self.release(contact.time)
+            if axis_zone:
+                print(f"Touch detected at ({x}, {y}) -> Axis zone '{axis_zone.name}'")
+                if HOLD_MODE and last_button:
+                    hold_button(None)
+            self.active = axis_zone
+        if axis_zone:
+            contact.touch_time = contact.time
+            axis_zone.update(x, y, axis_state, contact.time)
+            contact.down = True
+            return False
+        return True
+
+    def release(self, now=None):
+        if self.active:
+            self.active.release(axis_state, now)
+            self.active = None
+
+    def reset(self):
+        self.release()
+
+class ButtonAction(Stage):
+    """Taps the contact's button, again every REPEAT_DELAY, or holds it in HOLD_MODE"""
+
+    __slots__ = ("last_press",)
+
+    def __init__(self):
+        super().__init__("action")
+        self.last_press = now_ns()
+
+    def process(self, contact):
+        global last_button, buttons_sent
+        touched = contact.touched
+        zone_index = contact.zone
+        button_num = TOUCH_ZONES.code(zone_index) if zone_index is not None else None
+        x = contact.x
+        y = contact.y
+        
+        if touched:
+            contact.touch_time = contact.time
+        if touched and HOLD_MODE:
+            if button_num != last_button:
+                if button_num:
+                    print(f"Touch detected at ({x}, {y}) -> Holding button '{TOUCH_ZONES.name(zone_index)}'")
+                    buttons_sent += 1
+                    startup.first_key()
+                else:
+                    print(f"Touch detected at ({x}, {y}) -> No zone mapped")
+                hold_button(button_num)
+        elif touched:
+            if button_num:
+                # Send button on initial touch or after repeat delay
+                if (not contact.down or 
+                    button_num != last_button or 
+                    ticks_elapsed(contact.time, self.last_press) >= REPEAT_DELAY):
+                    print(f"Touch detected at ({x}, {y}) -> Sending button '{TOUCH_ZONES.name(zone_index)}'")
+                    send_button_press(button_num)
+                    buttons_sent += 1
+                    startup.first_key()
+                    last_button = button_num
+                    self.last_press = contact.time
+            else:
+                print(f"Touch detected at ({x}, {y}) -> No zone mapped")
+        elif HOLD_MODE and last_button:
+            hold_button(None)
+        
+        contact.down = touched
+        return True
+
+    def reset(self):
+        release_held_buttons()
+
+# Report -> touch -> axis zone? -> button zone -> button; see lib/touchscreen/pipeline.py
+axis_action = AxisAction() if axis_state else None
+TOUCH_STAGES = ((DecodeStage(touch_decoder),) + ((axis_action,) if axis_action else ())
+                + (ZoneStage(zone_tracker), ButtonAction()))
+stage_timings = StageTimings(TOUCH_STAGES) if STAGE_TIMING else None
+touch_pipeline = Pipeline(TOUCH_STAGES, stage_timings)
+contact = touch_pipeline.contact
+
+def release_held_buttons():
+    global last_button
+    last_button = None
+    zone_tracker.reset()
+    if held_buttons:
+        held_buttons.release_all()
+
+def on_control_change(name):
+    if name == "HOLD_MODE":
+        macro_scheduler.cancel_all()
+        release_held_buttons()
+    elif name == "TOUCH_ZONES":
+        release_held_buttons()
+        zone_tracker.rebuild()
+    elif name == "ZONE_HYSTERESIS":
+        zone_tracker.margin = ZONE_HYSTERESIS
+        zone_tracker.rebuild()
+    elif name == "IDLE_AFTER":
+        polling.idle_after = IDLE_AFTER
+    elif name == "TOUCH_TIMEOUT" and connected_touchscreen:
+        # A still finger's repeated reports have to keep arriving within the new timeout
+        set_idle(connected_touchscreen[0], connected_touchscreen[1], TOUCH_TIMEOUT // 2)
+    elif name == "AXIS_INTERVAL" and axis_state:
+        axis_state.min_interval = AXIS_INTERVAL
 
 
 print("Looking for USB touchscreen...")
-print("Touch zones configured:")
-for i, zone in enumerate(TOUCH_ZONES):
-    x1, y1, x2, y2, button_num, button_name = zone
-    print(f"  Zone {i+1}: ({x1},{y1}) to ({x2},{y2}) -> {button_name}")
+if VERBOSE_STARTUP:
+    print("Touch zones configured:")
+    for i, zone in enumerate(TOUCH_ZONES):
+        x1, y1, x2, y2, button_num, button_name = zone
+        print(f"  Zone {i+1}: ({x1},{y1}) to ({x2},{y2}) -> {button_name}")
+else:
+    print(f"{len(TOUCH_ZONES)} touch zones configured")
+
+connection = ConnectionSupervisor()
+gc_scheduler = GCScheduler(histogram=Histogram("gc_us"))
+
+# Live tuning and telemetry over the usb_cdc data port, each param with its allowed
+# range; times are milliseconds on the wire
+control = None
+if usb_cdc.data:
+    usb_cdc.data.timeout = 0
+    usb_cdc.data.write_timeout = 0.1
+    control = ControlChannel(
+        usb_cdc.data, globals(),
+        params=((PARAM_REPEAT_DELAY, "REPEAT_DELAY", NS_PER_MS, 1, 10000),
+                (PARAM_TOUCH_TIMEOUT, "TOUCH_TIMEOUT", NS_PER_MS, 20, 2000),
+                (PARAM_HOLD_MODE, "HOLD_MODE", 1, 0, 1),
+                (PARAM_IDLE_AFTER, "IDLE_AFTER", NS_PER_MS, 1, 60000),
+                (PARAM_AXIS_INTERVAL, "AXIS_INTERVAL", NS_PER_MS, 1, 1000),
+                (PARAM_ZONE_HYSTERESIS, "ZONE_HYSTERESIS", 1, 0, 1000)),
+        counter_names=("reports", "buttons", "connects", "disconnects",
+                       "recovered_read_errors", "gc_collections", "mem_free",
+                       "active_ms", "idle_ms", "axis_updates", "ready_ms", "first_key_ms"),
+        read_counters=lambda: (reports_processed, buttons_sent, connection.connect_count,
+                               connection.disconnect_count, connection.recovered_read_errors,
+                               gc_scheduler.collections, gc_scheduler.mem_free or 0,
+                               polling.active_time() // NS_PER_MS, polling.idle_time() // NS_PER_MS,
+                               axis_state.updates if axis_state else 0,
+                               startup.ready_ms, startup.first_key_ms),
+        histograms=(report_histogram, gc_scheduler.histogram) + (stage_timings.histograms if stage_timings else ()),
+        on_change=on_control_change,
+    )
+    print("Control channel listening on usb_cdc data port")
+else:
+    print("Control channel disabled - usb_cdc data port not enabled in boot.py")
+
+startup.ready()
 
 while True:
-    touchscreen_device, endpoint_addr, max_packet_size = find_touchscreen_and_endpoint()
+    if control:
+        control.poll()
+    touchscreen_device, endpoint = find_touchscreen_and_endpoint(connection.verbose_scan)
     
-    if touchscreen_device and endpoint_addr:
+    if touchscreen_device and endpoint:
         print(f"Found touchscreen: {touchscreen_device.product}")
+        connection.on_connected()
         try:
             touchscreen_device.set_configuration()
+            # Unchanged reports only every TOUCH_TIMEOUT / 2, so a still finger keeps its button
+            set_idle(touchscreen_device, endpoint, TOUCH_TIMEOUT // 2)
+            connected_touchscreen = (touchscreen_device, endpoint)
+            polling.set_report_interval(endpoint.interval_ms)
             print("Reading touch events... Touch the screen to trigger button presses")
             
+            # Reuse one buffer for every read so reports don't feed the heap
+            buffer = bytearray(endpoint.max_packet_size or 8)
+            buffer_view = memoryview(buffer)
+            
             while True:
                 try:
-                    buffer = bytearray(max_packet_size or 8)
-                    bytes_read = touchscreen_device.read(endpoint_addr, buffer, timeout=1000)
+                    if control:
+                        control.poll()
+                    macro_scheduler.poll()
+                    if axis_state:
+                        axis_state.poll()
+                    # Poll fast around contacts, slowly when idle; while a contact is
+                    # down, wake up often enough to notice TOUCH_TIMEOUT
+                    timeout = macro_scheduler.timeout_ms(polling.timeout_ms())
+                    if axis_state:
+                        timeout = axis_state.timeout_ms(timeout)
+                    if contact.down:
+                        timeout = min(timeout, TOUCH_TIMEOUT // NS_PER_MS)
+                    bytes_read = touchscreen_device.read(endpoint.address, buffer, timeout=timeout)
+                    connection.on_read_ok()
                     if bytes_read > 0:
-                        process_touch_report(buffer[:bytes_read])
+                        start = now_ns()
+                        reports_processed += 1
+                        touch_pipeline.feed(buffer_view[:bytes_read], start)
+                        report_histogram.record(ticks_diff(now_ns(), start) // NS_PER_US)
+                        gc_scheduler.set_active(contact.down)
+                        polling.on_report(contact.down)
                     else:
                         print("Read returned 0 bytes")
                         
                 except usb.core.USBTimeoutError:
-                    print(".", end="")  # Show we're still alive
+                    # End the contact whatever the mode, so a panel that goes quiet
+                    # without an untouched report doesn't keep GC disabled
+                    if contact.down and ticks_elapsed(now_ns(), contact.touch_time) > TOUCH_TIMEOUT:
+                        print("Touch timeout - ready for next touch")
+                        touch_pipeline.reset()
+                    polling.on_timeout(contact.down)
+                    # Quiet bus with no contact down: collect before the next touch
+                    gc_scheduler.set_active(contact.down)
+                    if not macro_scheduler.busy:
+                        gc_scheduler.idle()
+                        print(".", end="")  # Show we're still alive
                     continue
                 except Exception as e:
-                    print(f"Read error: {e}")
+                    # Retry transient transfer errors before tearing the device down
+                    touch_pipeline.reset()
+                    gc_scheduler.set_active(False)
+                    if connection.on_read_error(e):
+                        continue
                     break
                     
         except Exception as e:
             print(f"Error configuring touchscreen: {e}")
+        
+        connected_touchscreen = None
+        touch_pipeline.reset()
+        macro_scheduler.cancel_all()
+        gc_scheduler.set_active(False)
+        connection.on_disconnected()
+        connection.print_stats()
+        gc_scheduler.print_stats()
+        polling.print_stats()
     else:
-        print("No touchscreen found, retrying...")
+        connection.on_scan_failed()
     
-    time.sleep(2)
\ No newline at end of file
+    connection.wait()
\ No newline at end of file
@@ -1,48 +1,88 @@
-import time
+# Started first so the startup time includes loading everything below
+from touchscreen.startup import StartupTimer
+startup = StartupTimer("code_keyboard")
+
 import usb.core
-import usb.util
 import usb_hid
-import adafruit_usb_host_descriptors
 import supervisor
+import usb_cdc
+from touchscreen.adaptive_polling import AdaptivePolling
+from touchscreen.connection_supervisor import ConnectionSupervisor
+from touchscreen.control_channel import (ControlChannel, Histogram, PARAM_DEBOUNCE_TIME, PARAM_HOLD_MODE,
+                                         PARAM_IDLE_AFTER, PARAM_TOUCH_TIMEOUT, PARAM_ZONE_HYSTERESIS)
+from touchscreen.gc_scheduler import GCScheduler
+from touchscreen.macro_engine import MacroScheduler, compile_keyboard_macro, compile_tap
+from touchscreen.pipeline import ContactFilter, DecodeStage, Pipeline, Stage, StageTimings, ZoneStage
+from touchscreen.profile import load_decoder
+from touchscreen.timing import NS_PER_MS, NS_PER_US, ms, now_ns, ticks_add, ticks_diff, ticks_elapsed
+from touchscreen.touch import ZoneTracker
+from touchscreen.usb_discovery import find_touchscreen_and_endpoint, set_idle
+from touchscreen.zone_reports import compile_zone_report, describe_code
+from touchscreen.zone_table import KIND_KEYS, load_zone_table
 
 supervisor.runtime.autoreload = False
 
-SCREEN_WIDTH = 3800
-SCREEN_HEIGHT = 3800
+# Print the full zone table and HID device list at startup; off by default
+# because printing it all delays a cold start
+VERBOSE_STARTUP = False
 
-HID_CLASS = 0x03
-HID_SUBCLASS = 0x00
-HID_PROTOCOL = 0x00
+# Times are integer nanoseconds (see lib/touchscreen/timing.py)
+DEBOUNCE_TIME = ms(50)
+TOUCH_TIMEOUT = ms(100)  # Release key if no touch reports for 100ms
+TAP_TIME = ms(50)  # How long each key in a zone's macro is held down
+MACRO_GAP_TIME = ms(20)  # Pause between the keys of a multi-key macro
+# Hold mode: key down on contact, key up on release or TOUCH_TIMEOUT, instead of
+# a fixed tap. Zones with multi-step macros still play them as taps.
+HOLD_MODE = False
+# Poll slowly once the screen has been untouched this long; the first contact
+# still wakes the loop immediately because reads return as soon as data arrives
+IDLE_AFTER = ms(2000)
+# A contact keeps its zone until it is this many units past the zone's edge,
+# so a finger resting on the line between two zones doesn't flip between them
+ZONE_HYSTERESIS = 40
+# Time every pipeline stage into a "<stage>_us" histogram on the control
+# channel; costs two clock reads per stage per report, so off by default
+STAGE_TIMING = False
 
-DEBOUNCE_TIME = 0.05
-TOUCH_TIMEOUT = 0.1  # Release key if no touch reports for 100ms
+# Touch zones are edited in layouts/keyboard.json and compiled with
+# layout_compiler.py into keyboard.zones, which goes next to code.py on the
+# board. The table reads like a list of (x1, y1, x2, y2, keycode, name); the
+# keycode is a keyboard keycode, a CONSUMER_* usage from zone_reports for
+# media keys, or a macro: a tuple of (modifiers, keycode, ...) chords.
+ZONE_TABLE_PATH = "keyboard.zones"
+TOUCH_ZONES = load_zone_table(ZONE_TABLE_PATH, KIND_KEYS)
 
-TOUCH_ZONES = [
-    (300, 300, 1175, 1175, 0x2F, "["),
-    (1175, 300, 2050, 1175, 0x2D, "-"),
-    (2050, 300, 2925, 1175, 0x36, "<"),
-    (2925, 300, 3800, 1175, 0xCD, "Play/Pause"),
-    (300, 1175, 1175, 2050, 0x30, "]"),
-    (1175, 1175, 2050, 2050, 0x2E, "="),
-    (2050, 1175, 2925, 2050, 0x37, ">"),
-    (2925, 1175, 3800, 2050, 0x50, "Left Arrow"),
-    (300, 2050, 1175, 2925, 0xB6, "Prev Song"),
-    (1175, 2050, 2050, 2925, 0x4A, "Home"),
-    (2050, 2050, 2925, 2925, 0x52, "Up Arrow"),
-    (2925, 2050, 3800, 2925, 0x51, "Down Arrow"),
-    (300, 2925, 1175, 3800, 0xB5, "Next Song"),
-    (1175, 2925, 2050, 3800, 0x4D, "End"),
-    (2050, 2925, 2925, 3800, 0x28, "Enter"),
-    (2925, 2925, 3800, 3800, 0x4F, "Right Arrow"),
-]
+# Report layout and calibration from diagnostic_code.py's corner-touch detection,
+# if a touch_profile.json has been saved; otherwise the built-in decoding below
+touch_decoder = load_decoder(TOUCH_ZONES)
+zone_tracker = ZoneTracker(TOUCH_ZONES, ZONE_HYSTERESIS)
 
+# Tunables exposed over the control channel with their allowed range; times are
+# milliseconds on the wire. TOUCH_TIMEOUT stays above a few SET_IDLE periods.
+CONTROL_PARAMS = (
+    (PARAM_DEBOUNCE_TIME, "DEBOUNCE_TIME", NS_PER_MS, 0, 1000),
+    (PARAM_TOUCH_TIMEOUT, "TOUCH_TIMEOUT", NS_PER_MS, 20, 2000),
+    (PARAM_HOLD_MODE, "HOLD_MODE", 1, 0, 1),
+    (PARAM_IDLE_AFTER, "IDLE_AFTER", NS_PER_MS, 1, 60000),
+    (PARAM_ZONE_HYSTERESIS, "ZONE_HYSTERESIS", 1, 0, 1000),
+)
+COUNTER_NAMES = ("reports", "key_presses", "connects", "disconnects",
+                 "recovered_read_errors", "gc_collections", "mem_free",
+                 "active_ms", "idle_ms", "ready_ms", "first_key_ms")
 
 keyboard = None
 consumer_control = None
-last_touch_state = False
-last_state_change_time = 0
-last_touch_report_time = 0
-last_processed_touch = None
+control = None
+macro_scheduler = MacroScheduler()
+polling = AdaptivePolling(idle_after=IDLE_AFTER)
+zone_reports = []  # Per zone press/release pair bound to its device, None for multi-step macros
+zone_macros = []
+held_reports = set()
+held_zone = None
+connected_touchscreen = None  # (device, endpoint) while reading, so SET_IDLE can follow TOUCH_TIMEOUT
+report_histogram = Histogram("report_us")
+reports_processed = 0
+key_presses_sent = 0
 
 def initialize_hid_devices():
     global keyboard, consumer_control
@@ -50,7 +90,8 @@ def initialize_hid_devices():
     print(f"Total HID devices available: {len(usb_hid.devices)}")
     
     for device in usb_hid.devices:
-        print(f"Found USB HID device: usage_page={device.usage_page:02x}, usage={device.usage:02x}")
+        if VERBOSE_STARTUP:
+            print(f"Found USB HID device: usage_page={device.usage_page:02x}, usage={device.usage:02x}")
         if device.usage_page == 0x01 and device.usage == 0x06:
             keyboard = device
             print("Keyboard device found and initialized!")
@@ -63,221 +104,279 @@ def initialize_hid_devices():
     if not consumer_control:
         print("ERROR: Consumer Control device not found!")
 
-def find_touchscreen_and_endpoint():
-    print("Scanning for USB devices...")
-    device_count = 0
-    
-    for device in usb.core.find(find_all=True):
-        device_count += 1
+def compile_zones():
+    """Precompile every zone's reports so dispatching a touch is one table lookup
+
+    The tables are swapped in only once every zone has compiled, so a zone
+    that fails leaves the previous ones in place rather than half-built.
+    """
+    global zone_reports, zone_macros
+    reports = []
+    macros = []
+    for zone in TOUCH_ZONES:
+        keycode, key_name = zone[4], zone[5]
+        report = compile_zone_report(key_name, keycode, keyboard, consumer_control)
+        reports.append(report)
+        if report:
+            macro = compile_tap(key_name, report.device, report.press_report, report.release_report, TAP_TIME)
+        elif isinstance(keycode, tuple) and keyboard:
+            macro = compile_keyboard_macro(key_name, keyboard, keycode, TAP_TIME, MACRO_GAP_TIME)
+        else:
+            print(f"ERROR: No HID device for zone '{key_name}' ({describe_code(keycode)})")
+            macro = None
+        macros.append(macro)
+    zone_reports = reports
+    zone_macros = macros
+    print(f"Compiled {len(zone_macros)} zones")
+
+def hold_zone(zone_index):
+    """Release the currently held zone, then hold zone_index (None just releases)"""
+    global held_zone, key_presses_sent
+    if zone_index == held_zone:
+        return
+    report = zone_reports[zone_index] if zone_index is not None else None
+    try:
+        if held_zone is not None:
+            previous = zone_reports[held_zone]
+            if previous in held_reports:
+                held_reports.remove(previous)
+                # A press on the same device replaces the old report outright
+                if not report or report.device is not previous.device:
+                    previous.release()
+        held_zone = zone_index
+        if zone_index is None:
+            return
+        
+        key_presses_sent += 1
+        startup.first_key()
+        if report:
+            # A macro still playing on this device would overwrite the held key
+            macro_scheduler.cancel_device(report.device)
+            report.press()
+            held_reports.add(report)
+        elif zone_macros[zone_index]:
+            macro_scheduler.start(zone_macros[zone_index])
+    except Exception as e:
+        print(f"Error sending held key: {e}")
+
+def release_held_keys():
+    global held_zone
+    held_zone = None
+    for report in held_reports:
         try:
-            print(f"Device {device_count}: VID:{device.idVendor:04x} PID:{device.idProduct:04x}")
-            if hasattr(device, 'product') and device.product:
-                print(f"  Product: {device.product}")
-            
-            config_descriptor = adafruit_usb_host_descriptors.get_configuration_descriptor(device, 0)
-            i = 0
-            touchscreen_interface = None
-            endpoint_addr = None
-            
-            while i < len(config_descriptor):
-                descriptor_len = config_descriptor[i]
-                descriptor_type = config_descriptor[i + 1]
-                
-                if descriptor_type == adafruit_usb_host_descriptors.DESC_INTERFACE:
-                    interface_class = config_descriptor[i + 5]
-                    interface_subclass = config_descriptor[i + 6]
-                    interface_protocol = config_descriptor[i + 7]
-                    print(f"  Interface: Class={interface_class:02x} Sub={interface_subclass:02x} Proto={interface_protocol:02x}")
-                    
-                    if interface_class == HID_CLASS:
-                        print("  -> Found HID interface!")
-                        touchscreen_interface = config_descriptor[i + 2]
-                        
-                elif descriptor_type == adafruit_usb_host_descriptors.DESC_ENDPOINT and touchscreen_interface is not None:
-                    endpoint_address = config_descriptor[i + 2]
-                    if endpoint_address & 0x80:
-                        endpoint_addr = endpoint_address
-                        max_packet_size = config_descriptor[i + 4]
-                        print(f"  -> Found input endpoint: {endpoint_addr:02x}, packet size: {max_packet_size}")
-                        return device, endpoint_addr, max_packet_size
-                        
-                i += descriptor_len
+            report.release()
         except Exception as e:
-            print(f"Error checking device {device_count}: {e}")
-            continue
-    
-    print(f"Scanned {device_count} devices, no suitable touchscreen found")
-    return None, None, None
+            print(f"Error releasing '{report.name}': {e}")
+    held_reports.clear()
 
+def on_control_change(name):
+    if name == "TOUCH_ZONES":
+        release_held_keys()
+        compile_zones()
+        zone_tracker.rebuild()
+    elif name == "HOLD_MODE":
+        macro_scheduler.cancel_all()
+        release_held_keys()
+    elif name == "IDLE_AFTER":
+        polling.idle_after = IDLE_AFTER
+    elif name == "TOUCH_TIMEOUT" and connected_touchscreen:
+        # A still finger's repeated reports have to keep arriving within the new timeout
+        touchscreen_device, endpoint = connected_touchscreen
+        set_idle(touchscreen_device, endpoint, TOUCH_TIMEOUT // 2)
+    elif name == "ZONE_HYSTERESIS":
+        zone_tracker.margin = ZONE_HYSTERESIS
+        zone_tracker.rebuild()
 
-def parse_touchscreen_report(data):
-    if len(data) < 6:
-        return False, 0, 0
-    
-    touch_state = data[1] > 0
-    x = data[2] | (data[3] << 8)
-    y = data[4] | (data[5] << 8)
+def initialize_control_channel(connection, gc_scheduler):
+    global control
+    if not usb_cdc.data:
+        print("Control channel disabled - usb_cdc data port not enabled in boot.py")
+        return
+    usb_cdc.data.timeout = 0
+    usb_cdc.data.write_timeout = 0.1
     
-    scaled_x = x
-    scaled_y = y
+    def read_counters():
+        return (reports_processed, key_presses_sent, connection.connect_count,
+                connection.disconnect_count, connection.recovered_read_errors,
+                gc_scheduler.collections, gc_scheduler.mem_free or 0,
+                polling.active_time() // NS_PER_MS, polling.idle_time() // NS_PER_MS,
+                startup.ready_ms, startup.first_key_ms)
     
-    if scaled_x > SCREEN_WIDTH:
-        scaled_x = int((x / 4096.0) * SCREEN_WIDTH)
-    if scaled_y > SCREEN_HEIGHT:
-        scaled_y = int((y / 3072.0) * SCREEN_HEIGHT)
-    return bool(touch_state), scaled_x, scaled_y
+    histograms = (report_histogram, gc_scheduler.histogram)
+    if stage_timings:
+        histograms += stage_timings.histograms
+    control = ControlChannel(usb_cdc.data, globals(), CONTROL_PARAMS, COUNTER_NAMES,
+                             read_counters, histograms,
+                             on_change=on_control_change)
+    print("Control channel listening on usb_cdc data port")
 
-def find_touch_zone(x, y):
-    for zone in TOUCH_ZONES:
-        x1, y1, x2, y2, keycode, key_name = zone
-        if x1 <= x < x2 and y1 <= y < y2:
-            return keycode, key_name
-    return None, None
+class KeyAction(Stage):
+    """Presses the contact's zone: taps it, or holds it in HOLD_MODE, at most one change per DEBOUNCE_TIME"""
 
-def process_touch_report(data):
-    global last_touch_state, last_state_change_time, last_touch_report_time, last_processed_touch
-    
-    touched, x, y = parse_touchscreen_report(data)
-    current_time = time.monotonic()
-    
-    if touched:
-        last_touch_report_time = current_time
-        current_touch = (x, y)
+    __slots__ = ("last_change", "last_zone")
+
+    def __init__(self):
+        super().__init__("action")
+        self.last_change = ticks_add(now_ns(), -DEBOUNCE_TIME)
+        self.last_zone = None
+
+    def process(self, contact):
+        zone_index = contact.zone
+        current_time = contact.time
+        if HOLD_MODE:
+            if zone_index != held_zone:
+                # Debounce new contacts; sliding between zones switches right away
+                if not contact.down and ticks_elapsed(current_time, self.last_change) < DEBOUNCE_TIME:
+                    return False
+                self.last_change = current_time
+                if zone_index is not None:
+                    print(f"Touch at ({contact.x}, {contact.y}) -> Holding '{TOUCH_ZONES.name(zone_index)}'")
+                else:
+                    print(f"Touch at ({contact.x}, {contact.y}) -> No zone mapped")
+                hold_zone(zone_index)
+            contact.down = True
+            return True
         
-        # Check if this is a new touch or same position being held
-        if not last_touch_state or (last_processed_touch and (
-            abs(current_touch[0] - last_processed_touch[0]) > 50 or 
-            abs(current_touch[1] - last_processed_touch[1]) > 50)):
-            
-            # New touch or significantly moved - send key press
-            if current_time - last_state_change_time < DEBOUNCE_TIME:
-                return last_touch_state
-            last_state_change_time = current_time
+        # Press on a new contact, or when it slides clearly into another zone
+        if not contact.down or (self.last_zone is not None and zone_index != self.last_zone):
+            if ticks_elapsed(current_time, self.last_change) < DEBOUNCE_TIME:
+                return False
+            self.last_change = current_time
             
-            keycode, key_name = find_touch_zone(x, y)
-            if keycode:
-                print(f"Touch at ({x}, {y}) -> Single key press '{key_name}'")
-                send_single_key_press(keycode, key_name)
-                last_processed_touch = current_touch
+            if zone_index is not None:
+                key_name = TOUCH_ZONES.name(zone_index)
+                print(f"Touch at ({contact.x}, {contact.y}) -> Single key press '{key_name}'")
+                send_zone_macro(zone_index, key_name)
+                self.last_zone = zone_index
             else:
-                print(f"Touch at ({x}, {y}) -> No zone mapped")
+                print(f"Touch at ({contact.x}, {contact.y}) -> No zone mapped")
             
-            last_touch_state = True
-    else:
-        # No touch detected - reset state immediately
-        if last_touch_state:
-            print("Touch released - ready for next touch")
-            last_touch_state = False
-            last_processed_touch = None
-    
-    return touched
-
-def send_single_key_press(keycode, key_name):
-    if not keycode:
-        print("ERROR: Cannot send key - keycode is None or 0")
-        return
+            contact.down = True
+        return True
 
-    if keycode == 0xCD:  # Play/Pause
-        _send_single_media_key(keycode, key_name)
-    else:
-        _send_single_keyboard_key(keycode, key_name)
+    def reset(self):
+        self.last_zone = None
+        release_held_keys()
 
-def _send_single_media_key(keycode, key_name):
-    if not consumer_control:
-        print("ERROR: Cannot send media key - no consumer control device available")
-        return
-        
-    print(f"Sending single media key '{key_name}' (keycode: 0x{keycode:02x})...")
-    try:
-        # Press
-        report = bytearray(2)
-        report[0] = 5
-        if keycode == 0xCD:
-            report[1] = 0x01
-        consumer_control.send_report(report)
-        time.sleep(0.05)
-        
-        # Release
-        report = bytearray(2)
-        report[0] = 5
-        report[1] = 0x00
-        consumer_control.send_report(report)
-        
-        print(f"Successfully sent single media key '{key_name}'")
-    except Exception as e:
-        print(f"Error sending media key '{key_name}': {e}")
+def on_touch_released():
+    print("Touch released - ready for next touch")
+    release_touch_state()
 
-def _send_single_keyboard_key(keycode, key_name):
-    if not keyboard:
-        print("ERROR: Cannot send key - no keyboard device available")
+def send_zone_macro(zone_index, key_name):
+    global key_presses_sent
+    macro = zone_macros[zone_index]
+    if not macro:
+        print(f"ERROR: Cannot send '{key_name}' - zone has no compiled macro")
         return
-
-    print(f"Sending single key '{key_name}' (keycode: 0x{keycode:02x})...")
-    try:
-        # Press
-        report = bytearray(8)
-        report[0] = 0
-        report[1] = 0
-        report[2] = keycode
-        keyboard.send_report(report)
-        time.sleep(0.05)
-        
-        # Release
-        report = bytearray(8)
-        keyboard.send_report(report)
-        
-        print(f"Successfully sent single key '{key_name}'")
-    except Exception as e:
-        print(f"Error sending key '{key_name}': {e}")
+    
+    key_presses_sent += 1
+    startup.first_key()
+    macro_scheduler.start(macro)
 
 def display_touch_zones():
     print("Touch zones configured:")
     for i, zone in enumerate(TOUCH_ZONES):
         x1, y1, x2, y2, keycode, key_name = zone
-        print(f"  Zone {i+1}: ({x1},{y1}) to ({x2},{y2}) -> {key_name} (0x{keycode:02x})")
+        print(f"  Zone {i+1}: ({x1},{y1}) to ({x2},{y2}) -> {key_name} ({describe_code(keycode)})")
+
+def release_touch_state():
+    touch_pipeline.reset()
+
+# Report -> touch -> still down? -> zone -> key; see lib/touchscreen/pipeline.py
+TOUCH_STAGES = (DecodeStage(touch_decoder), ContactFilter(on_touch_released), ZoneStage(zone_tracker), KeyAction())
+stage_timings = StageTimings(TOUCH_STAGES) if STAGE_TIMING else None
+touch_pipeline = Pipeline(TOUCH_STAGES, stage_timings)
 
-def run_touch_event_loop(touchscreen_device, endpoint_addr, max_packet_size):
+def run_touch_event_loop(touchscreen_device, endpoint, connection, gc_scheduler):
+    global reports_processed, connected_touchscreen
+    contact = touch_pipeline.contact
     try:
         touchscreen_device.set_configuration()
+        # Unchanged reports only every TOUCH_TIMEOUT / 2, so a still finger keeps its key
+        set_idle(touchscreen_device, endpoint, TOUCH_TIMEOUT // 2)
+        connected_touchscreen = (touchscreen_device, endpoint)
+        polling.set_report_interval(endpoint.interval_ms)
         print("Reading touch events... Touch the screen to trigger key presses")
         
+        # Reuse one buffer for every read so reports don't feed the heap
+        buffer = bytearray(endpoint.max_packet_size or 8)
+        buffer_view = memoryview(buffer)
+        
         while True:
             try:
-                buffer = bytearray(max_packet_size or 8)
-                bytes_read = touchscreen_device.read(endpoint_addr, buffer, timeout=100)
+                if control:
+                    control.poll()
+                # Wake up in time for the next report of any running macro
+                macro_scheduler.poll()
+                timeout = macro_scheduler.timeout_ms(polling.timeout_ms())
+                bytes_read = touchscreen_device.read(endpoint.address, buffer, timeout=timeout)
+                connection.on_read_ok()
                 if bytes_read > 0:
-                    process_touch_report(buffer[:bytes_read])
+                    start = now_ns()
+                    reports_processed += 1
+                    touch_pipeline.feed(buffer_view[:bytes_read], start)
+                    report_histogram.record(ticks_diff(now_ns(), start) // NS_PER_US)
+                    gc_scheduler.set_active(contact.down)
+                    polling.on_report(contact.down)
                     
             except usb.core.USBTimeoutError:
                 # Process timeout to handle touch state resets
-                current_time = time.monotonic()
-                global last_touch_state, last_touch_report_time
-                if current_time - last_touch_report_time > TOUCH_TIMEOUT:
-                    if last_touch_state:
+                if ticks_elapsed(now_ns(), contact.touch_time) > TOUCH_TIMEOUT:
+                    if contact.down:
                         print("Touch timeout - ready for next touch")
-                        last_touch_state = False
-                print(".", end="")
+                        release_touch_state()
+                polling.on_timeout(contact.down)
+                # Scheduled collections only in quiet periods; gc.threshold covers long holds
+                gc_scheduler.set_active(contact.down)
+                if not macro_scheduler.busy:
+                    gc_scheduler.idle()
+                    print(".", end="")
                 continue
             except Exception as e:
-                print(f"Read error: {e}")
+                # A single failed transfer should not cost a full re-enumeration
+                release_touch_state()
+                gc_scheduler.set_active(False)
+                if connection.on_read_error(e):
+                    continue
                 break
                 
     except Exception as e:
         print(f"Error configuring touchscreen: {e}")
+    connected_touchscreen = None
 
 def main():
     initialize_hid_devices()
+    compile_zones()
     print("Looking for USB touchscreen...")
-    display_touch_zones()
+    if VERBOSE_STARTUP:
+        display_touch_zones()
+    else:
+        print(f"{len(TOUCH_ZONES)} touch zones configured")
+    connection = ConnectionSupervisor()
+    gc_scheduler = GCScheduler(histogram=Histogram("gc_us"))
+    initialize_control_channel(connection, gc_scheduler)
+    startup.ready()
     
     while True:
-        touchscreen_device, endpoint_addr, max_packet_size = find_touchscreen_and_endpoint()
+        if control:
+            control.poll()
+        touchscreen_device, endpoint = find_touchscreen_and_endpoint(connection.verbose_scan)
         
-        if touchscreen_device and endpoint_addr:
+        if touchscreen_device and endpoint:
             print(f"Found touchscreen: {touchscreen_device.product}")
-            run_touch_event_loop(touchscreen_device, endpoint_addr, max_packet_size)
+            connection.on_connected()
+            run_touch_event_loop(touchscreen_device, endpoint, connection, gc_scheduler)
+            release_touch_state()
+            macro_scheduler.cancel_all()
+            gc_scheduler.set_active(False)
+            connection.on_disconnected()
+            connection.print_stats()
+            gc_scheduler.print_stats()
+            polling.print_stats()
         else:
-            print("No touchscreen found, retrying...")
+            connection.on_scan_failed()
+        
+        connection.wait()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
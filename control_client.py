@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import struct
+import sys
+import time
+
+# The protocol lives in the firmware library; on the board /lib is on the path already
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib"))
+
+from touchscreen import control_channel as protocol
+from touchscreen.timing import NS_PER_MS
+
+
+class ControlError(Exception):
+    pass
+
+
+class LoopbackSerial:
+    """In-memory stand-in for one end of a serial link"""
+
+    def __init__(self):
+        self.peer = None
+        self._rx = bytearray()
+
+    @classmethod
+    def pair(cls):
+        a, b = cls(), cls()
+        a.peer, b.peer = b, a
+        return a, b
+
+    @property
+    def in_waiting(self):
+        return len(self._rx)
+
+    def readinto(self, buffer):
+        count = min(len(buffer), len(self._rx))
+        buffer[:count] = self._rx[:count]
+        del self._rx[:count]
+        return count
+
+    def read(self, size=1):
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    def write(self, data):
+        self.peer._rx.extend(data)
+        return len(data)
+
+
+class ControlClient:
+    """Desktop side of the control channel protocol"""
+
+    def __init__(self, serial, timeout=1.0, pump=None):
+        self.serial = serial
+        self.timeout = timeout
+        # With a loopback link, pump runs the firmware side while we wait
+        self.pump = pump
+        self._parser = protocol.FrameParser()
+
+    def request(self, command, payload=b""):
+        self.serial.write(protocol.encode_frame(command, payload))
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            if self.pump:
+                self.pump()
+            data = self.serial.read(self.serial.in_waiting or 1)
+            for byte in data:
+                if not self._parser.feed(byte):
+                    continue
+                parser = self._parser
+                reply = bytes(parser.payload[:parser.length])
+                if not parser.checksum_ok:
+                    raise ControlError("Reply failed checksum")
+                if parser.command == protocol.CMD_ERROR:
+                    raise ControlError(f"Command 0x{reply[0]:02x} failed with error {reply[1]}")
+                if parser.command != command | protocol.REPLY_FLAG:
+                    raise ControlError(f"Unexpected reply 0x{parser.command:02x}")
+                return reply
+        raise ControlError(f"No reply to command 0x{command:02x}")
+
+    def ping(self):
+        start = time.monotonic()
+        self.request(protocol.CMD_PING)
+        return time.monotonic() - start
+
+    def list_names(self, kind):
+        reply = self.request(protocol.CMD_LIST_NAMES, bytes((kind,)))
+        names = {}
+        i = 0
+        while i < len(reply):
+            entry_id, length = reply[i], reply[i + 1]
+            names[entry_id] = reply[i + 2:i + 2 + length].decode("utf-8")
+            i += 2 + length
+        return names
+
+    def get_counters(self):
+        names = self.list_names(protocol.KIND_COUNTERS)
+        reply = self.request(protocol.CMD_GET_COUNTERS)
+        values = struct.unpack(f"<{len(reply) // 4}I", reply)
+        return {names.get(i, str(i)): value for i, value in enumerate(values)}
+
+    def get_histogram(self, histogram_id):
+        reply = self.request(protocol.CMD_GET_HISTOGRAM, bytes((histogram_id,)))
+        return list(struct.unpack(f"<{(len(reply) - 1) // 4}I", reply[1:]))
+
+    def get_param(self, param_id):
+        reply = self.request(protocol.CMD_GET_PARAM, bytes((param_id,)))
+        return struct.unpack_from("<i", reply, 1)[0]
+
+    def set_param(self, param_id, value):
+        reply = self.request(protocol.CMD_SET_PARAM, struct.pack("<Bi", param_id, value))
+        return struct.unpack_from("<i", reply, 1)[0]
+
+    def get_zone(self, index):
+        return self._decode_zone(self.request(protocol.CMD_GET_ZONE, bytes((index,))))
+
+    def set_zone(self, index, x1, y1, x2, y2, code, name):
+        payload = struct.pack(protocol.ZONE_FORMAT, index, x1, y1, x2, y2, code) + name.encode("utf-8")
+        return self._decode_zone(self.request(protocol.CMD_SET_ZONE, payload))
+
+    def _decode_zone(self, reply):
+        fields = struct.unpack_from(protocol.ZONE_FORMAT, reply, 0)
+        return fields[1:] + (reply[protocol.ZONE_HEADER_SIZE:].decode("utf-8"),)
+
+    def param_ids(self):
+        return {name: param_id for param_id, name in self.list_names(protocol.KIND_PARAMS).items()}
+
+
+def open_loopback():
+    """Connect a client to an in-process ControlChannel with demo settings"""
+    client_end, board_end = LoopbackSerial.pair()
+    namespace = {
+        "DEBOUNCE_TIME": 50 * NS_PER_MS,
+        "TOUCH_TIMEOUT": 100 * NS_PER_MS,
+        "TOUCH_ZONES": [(300, 300, 1175, 1175, 0x2F, "[")],
+    }
+    histogram = protocol.Histogram("report_us")
+    for value in (120, 340, 90, 5000):
+        histogram.record(value)
+    channel = protocol.ControlChannel(
+        board_end, namespace,
+        params=((protocol.PARAM_DEBOUNCE_TIME, "DEBOUNCE_TIME", NS_PER_MS, 0, 1000),
+                (protocol.PARAM_TOUCH_TIMEOUT, "TOUCH_TIMEOUT", NS_PER_MS, 20, 2000)),
+        counter_names=("reports", "key_presses"),
+        read_counters=lambda: (42, 7),
+        histograms=(histogram,),
+    )
+    return ControlClient(client_end, pump=channel.poll)
+
+
+def open_serial(port):
+    import serial  # pyserial, only needed against real hardware
+    return ControlClient(serial.Serial(port, 115200, timeout=0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read telemetry and tune touchscreen firmware over USB CDC")
+    parser.add_argument("--port", help="Serial port of the CDC data channel, e.g. /dev/ttyACM1")
+    parser.add_argument("--loopback", action="store_true", help="Talk to an in-process stand-in board")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("ping")
+    sub.add_parser("counters")
+    sub.add_parser("histograms")
+    sub.add_parser("params")
+    set_parser = sub.add_parser("set")
+    set_parser.add_argument("name")
+    set_parser.add_argument("value", type=int)
+    zone_parser = sub.add_parser("zone")
+    zone_parser.add_argument("index", type=int, help="1-based zone number")
+    set_zone_parser = sub.add_parser("set-zone")
+    set_zone_parser.add_argument("index", type=int, help="1-based zone number")
+    for field in ("x1", "y1", "x2", "y2"):
+        set_zone_parser.add_argument(field, type=int)
+    set_zone_parser.add_argument("code", type=lambda text: int(text, 0))
+    set_zone_parser.add_argument("name")
+    args = parser.parse_args()
+
+    if args.loopback:
+        client = open_loopback()
+    elif args.port:
+        client = open_serial(args.port)
+    else:
+        parser.error("either --port or --loopback is required")
+
+    if args.command == "ping":
+        print(f"Round trip: {client.ping() * 1000:.1f}ms")
+    elif args.command == "counters":
+        for name, value in client.get_counters().items():
+            print(f"{name}: {value}")
+    elif args.command == "histograms":
+        for histogram_id, name in client.list_names(protocol.KIND_HISTOGRAMS).items():
+            print(f"{name}: {client.get_histogram(histogram_id)}")
+    elif args.command == "params":
+        for name, param_id in client.param_ids().items():
+            print(f"{name}: {client.get_param(param_id)}")
+    elif args.command == "set":
+        param_id = client.param_ids()[args.name]
+        print(f"{args.name}: {client.set_param(param_id, args.value)}")
+    elif args.command == "zone":
+        print(client.get_zone(args.index - 1))
+    elif args.command == "set-zone":
+        print(client.set_zone(args.index - 1, args.x1, args.y1, args.x2, args.y2, args.code, args.name))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,16 @@
-import time
+# Started first so the startup time includes loading everything below
+from touchscreen.startup import StartupTimer
+startup = StartupTimer("diagnostic_code")
+
+import json
 import usb.core
-import usb.util
-import adafruit_usb_host_descriptors
 import supervisor
+from touchscreen.format_detect import FormatDetector, capture_line, save_profile
+from touchscreen.profile import PROFILE_PATH
+from touchscreen.timing import NS_PER_MS, ms, now_ns, sleep_ns, ticks_elapsed
+from touchscreen.usb_discovery import find_touchscreen_and_endpoint
 supervisor.runtime.autoreload = False
 
-def find_touchscreen_and_endpoint():
-    print("Scanning for USB devices...")
-    device_count = 0
-    
-    for device in usb.core.find(find_all=True):
-        device_count += 1
-        try:
-            print(f"Device {device_count}: VID:{device.idVendor:04x} PID:{device.idProduct:04x}")
-            if hasattr(device, 'product') and device.product:
-                print(f"  Product: {device.product}")
-            
-            config_descriptor = adafruit_usb_host_descriptors.get_configuration_descriptor(device, 0)
-            i = 0
-            touchscreen_interface = None
-            endpoint_addr = None
-            
-            while i < len(config_descriptor):
-                descriptor_len = config_descriptor[i]
-                descriptor_type = config_descriptor[i + 1]
-                
-                if descriptor_type == adafruit_usb_host_descriptors.DESC_INTERFACE:
-                    interface_class = config_descriptor[i + 5]
-                    interface_subclass = config_descriptor[i + 6]
-                    interface_protocol = config_descriptor[i + 7]
-                    print(f"  Interface: Class={interface_class:02x} Sub={interface_subclass:02x} Proto={interface_protocol:02x}")
-                    
-                    if interface_class == 0x03:  # HID_CLASS
-                        print(f"  -> Found HID interface!")
-                        touchscreen_interface = config_descriptor[i + 2]
-                        
-                elif descriptor_type == adafruit_usb_host_descriptors.DESC_ENDPOINT and touchscreen_interface is not None:
-                    endpoint_address = config_descriptor[i + 2]
-                    if endpoint_address & 0x80:  # Input endpoint
-                        endpoint_addr = endpoint_address
-                        max_packet_size = config_descriptor[i + 4]
-                        print(f"  -> Found input endpoint: {endpoint_addr:02x}, packet size: {max_packet_size}")
-                        return device, endpoint_addr, max_packet_size
-                        
-                i += descriptor_len
-        except Exception as e:
-            print(f"Error checking device {device_count}: {e}")
-            continue
-    
-    print(f"Scanned {device_count} devices, no suitable touchscreen found")
-    return None, None, None
-
 def parse_touchscreen_report(data):
     """Parse touchscreen HID report and show multiple interpretations"""
     if len(data) < 6:
@@ -84,19 +44,39 @@ def parse_touchscreen_report(data):
 
 def log_touch_event(x, y, interpretations):
     """Log touch coordinates to console"""
-    current_time = time.monotonic()
+    current_time = now_ns()
     print(f"=== TOUCH EVENT ===")
-    print(f"Time: {current_time:.2f}s")
+    print(f"Time: {current_time // NS_PER_MS}ms")
     print(f"Primary coordinates: ({x}, {y})")
     print(f"All interpretations: {interpretations}")
     print(f"===================")
 
+def report_corner_progress(detector, corner):
+    """Prompt for the next corner, or finish detection; returns the corner now awaited"""
+    if detector.corner == corner:
+        return corner
+    if not detector.done:
+        print(f"Corner {detector.corner + 1}: touch and hold {detector.current_corner}")
+        return detector.corner
+    print("=== FORMAT DETECTION ===")
+    detector.print_scores()
+    if detector.profile:
+        if save_profile(detector.profile):
+            print(f"Saved {PROFILE_PATH}; code_keyboard.py and code_fixed.py load it at startup")
+        else:
+            print(f"Filesystem is read-only; save this line as {PROFILE_PATH} on CIRCUITPY:")
+            print(json.dumps(detector.profile))
+    print("========================")
+    return detector.corner
+
 print("=== TouchScreen Coordinate Diagnostic ===")
 print("Instructions: Touch corners in this order:")
 print("1. Top-Left")
 print("2. Top-Right") 
 print("3. Bottom-Left")
 print("4. Bottom-Right")
+print("Each report is also logged as 'R <ms> <bytes>' so a capture can be")
+print("re-run on a computer, from lib/: python -m touchscreen.format_detect capture.txt")
 print("==========================================")
 
 print("Looking for USB touchscreen...")
@@ -104,26 +84,37 @@ print("Looking for USB touchscreen...")
 # Global variables for touch state tracking
 last_touch_state = False
 last_touch_time = 0
-TOUCH_DELAY = 0.3  # Minimum time between logged touches
+TOUCH_DELAY = ms(300)  # Minimum time between logged touches
+detector = FormatDetector()
+awaited_corner = -1
+startup.ready()
 
 while True:
-    touchscreen_device, endpoint_addr, max_packet_size = find_touchscreen_and_endpoint()
+    touchscreen_device, endpoint = find_touchscreen_and_endpoint()
     
-    if touchscreen_device and endpoint_addr:
+    if touchscreen_device and endpoint:
         print(f"Found touchscreen: {touchscreen_device.product}")
         try:
             touchscreen_device.set_configuration()
+            # No SET_IDLE here: corner detection wants every report of a resting finger
             print("Reading touch events... Touch corners now!")
+            awaited_corner = report_corner_progress(detector, awaited_corner)
             
             while True:
                 try:
-                    buffer = bytearray(max_packet_size or 8)
-                    bytes_read = touchscreen_device.read(endpoint_addr, buffer, timeout=1000)
+                    buffer = bytearray(endpoint.max_packet_size or 8)
+                    bytes_read = touchscreen_device.read(endpoint.address, buffer, timeout=1000)
                     if bytes_read > 0:
-                        touched, x, y, interpretations = parse_touchscreen_report(buffer[:bytes_read])
-                        current_time = time.monotonic()
+                        report = buffer[:bytes_read]
+                        now = now_ns()
+                        print(capture_line(now, report))
+                        if not detector.done:
+                            detector.feed(report, now)
+                            awaited_corner = report_corner_progress(detector, awaited_corner)
+                        touched, x, y, interpretations = parse_touchscreen_report(report)
+                        current_time = now
                         
-                        if touched and (not last_touch_state or current_time - last_touch_time >= TOUCH_DELAY):
+                        if touched and (not last_touch_state or ticks_elapsed(current_time, last_touch_time) >= TOUCH_DELAY):
                             log_touch_event(x, y, interpretations)
                             last_touch_time = current_time
                         
@@ -132,6 +123,9 @@ while True:
                         print(".", end="")
                         
                 except usb.core.USBTimeoutError:
+                    if not detector.done:
+                        detector.poll(now_ns())
+                        awaited_corner = report_corner_progress(detector, awaited_corner)
                     print(".", end="")
                     continue
                 except Exception as e:
@@ -143,4 +137,4 @@ while True:
     else:
         print("No touchscreen found, retrying...")
     
-    time.sleep(2)
\ No newline at end of file
+    sleep_ns(ms(2000))
\ No newline at end of file
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+
+# Zone layout compiler. A layout in layouts/*.json is the only description of
+# a zone table: the firmware loads the binary table compiled from it and
+# touchscreen_overlay.py draws the overlay data compiled from it, so the two
+# can't drift apart. Layouts are checked for overlapping zones, gaps, and
+# codes the entry script's HID devices can't send before anything is written.
+#
+#   python layout_compiler.py                           # every layout into build/
+#   python layout_compiler.py layouts/keyboard.json --strict
+#
+# Writes build/<layout>.zones for the board (build_mpy.py --deploy copies it
+# next to code.py) and build/<layout>.overlay.json for the overlay. A layout:
+#
+#   {"kind": "keys", "overlay": {"swap_xy": true}, "zones": [
+#     {"rect": [300, 300, 1175, 1175], "name": "[", "key": "0x2F"},
+#     {"rect": [2925, 300, 3800, 1175], "name": "Play/Pause", "consumer": "PLAY_PAUSE"},
+#     {"rect": [300, 1175, 1175, 2050], "name": "Copy", "macro": [["LEFT_CTRL", "0x06"]]}]}
+#
+# "keys" layouts are for code_keyboard.py: each zone has a keyboard "key", a
+# "consumer" usage (a CONSUMER_* name from zone_reports.py or a number) or a
+# "macro" of chords, each a list of MOD_* names from macro_engine.py and
+# keycodes. "buttons" layouts are for code_fixed.py: each zone has a joystick
+# "button" number. Numbers may be written as JSON numbers or "0x.." strings.
+# Rects are (x1, y1, x2, y2) touch coordinates, x2 and y2 exclusive.
+# "overlay": {"swap_xy": true} draws touch x across the screen's y axis.
+
+import argparse
+import glob
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "lib"))
+
+from touchscreen import macro_engine, zone_reports
+from touchscreen.control_channel import MAX_PAYLOAD, ZONE_HEADER_SIZE
+from touchscreen.joystick import BUTTON_COUNT
+from touchscreen.touch import SCREEN_HEIGHT, SCREEN_WIDTH
+from touchscreen.zone_table import KIND_BUTTONS, KIND_KEYS, encode_zone_table
+
+LAYOUT_DIR = os.path.join(ROOT, "layouts")
+OUTPUT_DIR = os.path.join(ROOT, "build")
+TABLE_EXTENSION = ".zones"
+OVERLAY_EXTENSION = ".overlay.json"
+
+KINDS = {"keys": KIND_KEYS, "buttons": KIND_BUTTONS}
+CODE_FIELDS = {"keys": ("key", "consumer", "macro"), "buttons": ("button",)}
+KEYCODE_MIN = 0x04  # Below are the "no event" and error codes
+KEYCODE_MAX = 0xDD  # Logical Maximum of CircuitPython's built-in keyboard descriptor
+MAX_NAME_BYTES = MAX_PAYLOAD - ZONE_HEADER_SIZE  # Longest name a control channel zone reply carries
+MAX_REPORTED_GAPS = 5
+
+MODIFIERS = {name[4:]: value for name, value in vars(macro_engine).items() if name.startswith("MOD_")}
+CONSUMER_USAGES = {name[9:]: value for name, value in vars(zone_reports).items()
+                   if name.startswith("CONSUMER_") and name != "CONSUMER_USAGE_MAX" and name != "CONSUMER_REPORT_ID"}
+
+
+class LayoutError(Exception):
+    pass
+
+
+class Layout:
+    """A parsed layout: its zones as firmware (x1, y1, x2, y2, code, name) tuples plus what checking found"""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.errors = []
+        self.warnings = []
+        try:
+            with open(path) as f:
+                source = json.load(f)
+        except (OSError, ValueError) as e:
+            raise LayoutError(f"{path}: {e}")
+        self.kind_name = source.get("kind")
+        if self.kind_name not in KINDS:
+            raise LayoutError(f"{path}: \"kind\" must be one of {', '.join(KINDS)}")
+        self.kind = KINDS[self.kind_name]
+        self.swap_xy = bool(source.get("overlay", {}).get("swap_xy", False))
+        self.zones = []
+        self.numbers = []  # 1-based position of each zone in the layout file
+        for number, entry in enumerate(source.get("zones", ()), 1):
+            zone = self._parse_zone(number, entry)
+            if zone:
+                self.zones.append(zone)
+                self.numbers.append(number)
+        if not self.zones and not self.errors:
+            self.errors.append("no zones")
+        if self.zones:
+            self._check_overlaps()
+            self._check_gaps()
+            self._check_names()
+
+    def _parse_zone(self, number, entry):
+        label = f"zone {number} '{entry.get('name', '')}'"
+        rect = entry.get("rect")
+        if (not isinstance(rect, list) or len(rect) != 4
+                or not all(isinstance(value, int) for value in rect)):
+            self.errors.append(f"{label}: \"rect\" must be [x1, y1, x2, y2] integers")
+            return None
+        x1, y1, x2, y2 = rect
+        if not (0 <= x1 < x2 <= SCREEN_WIDTH and 0 <= y1 < y2 <= SCREEN_HEIGHT):
+            self.errors.append(f"{label}: rect {rect} is empty or outside the {SCREEN_WIDTH}x{SCREEN_HEIGHT} screen")
+            return None
+        name = entry.get("name")
+        if not isinstance(name, str) or not name:
+            self.errors.append(f"{label}: needs a \"name\"")
+            return None
+        if len(name.encode("utf-8")) > MAX_NAME_BYTES:
+            self.errors.append(f"{label}: name is longer than {MAX_NAME_BYTES} bytes")
+            return None
+        fields = [field for field in ("key", "consumer", "macro", "button") if field in entry]
+        if len(fields) != 1:
+            self.errors.append(f"{label}: needs exactly one of {', '.join(CODE_FIELDS[self.kind_name])}")
+            return None
+        field = fields[0]
+        if field not in CODE_FIELDS[self.kind_name]:
+            device = "joystick buttons" if self.kind_name == "keys" else "keyboard and consumer keys"
+            self.errors.append(f"{label}: \"{field}\" can't be sent by a \"{self.kind_name}\" layout "
+                               f"(its entry script has no {device})")
+            return None
+        try:
+            code = getattr(self, "_parse_" + field)(label, entry[field])
+        except (TypeError, ValueError) as e:
+            self.errors.append(f"{label}: bad \"{field}\": {e}")
+            return None
+        return (x1, y1, x2, y2, code, name)
+
+    def _parse_key(self, label, value):
+        keycode = parse_number(value)
+        if not KEYCODE_MIN <= keycode <= KEYCODE_MAX:
+            raise ValueError(f"keycode 0x{keycode:02x} is outside 0x{KEYCODE_MIN:02x}-0x{KEYCODE_MAX:02x}")
+        for usage_name, usage in CONSUMER_USAGES.items():
+            if usage & ~zone_reports.CONSUMER == keycode:
+                self.warnings.append(f"{label}: keycode 0x{keycode:02x} is also the consumer usage "
+                                     f"{usage_name}; use \"consumer\": \"{usage_name}\" if that was meant")
+        return keycode
+
+    def _parse_consumer(self, label, value):
+        if isinstance(value, str) and value in CONSUMER_USAGES:
+            return CONSUMER_USAGES[value]
+        try:
+            usage = parse_number(value)
+        except ValueError:
+            raise ValueError(f"{value!r} is neither a CONSUMER_* name from zone_reports.py nor a number")
+        if not 0 < usage <= zone_reports.CONSUMER_USAGE_MAX:
+            raise ValueError(f"usage 0x{usage:x} is outside 0x001-0x{zone_reports.CONSUMER_USAGE_MAX:03x}")
+        return zone_reports.CONSUMER | usage
+
+    def _parse_macro(self, label, value):
+        if not isinstance(value, list) or not value:
+            raise ValueError("must be a list of chords")
+        chords = []
+        for chord in value:
+            if not isinstance(chord, list):
+                raise ValueError("each chord must be a list of modifiers and keycodes")
+            modifiers = 0
+            keys = []
+            for item in chord:
+                if isinstance(item, str) and item.upper().replace("MOD_", "", 1) in MODIFIERS:
+                    modifiers |= MODIFIERS[item.upper().replace("MOD_", "", 1)]
+                else:
+                    keys.append(self._parse_key(label, item))
+            if len(keys) > macro_engine.MAX_CHORD_KEYS:
+                raise ValueError(f"a chord has more than {macro_engine.MAX_CHORD_KEYS} keys")
+            chords.append((modifiers,) + tuple(keys))
+        return tuple(chords)
+
+    def _parse_button(self, label, value):
+        button = parse_number(value)
+        if not 1 <= button <= BUTTON_COUNT:
+            raise ValueError(f"button {button} is outside 1-{BUTTON_COUNT} (BUTTON_COUNT in joystick.py)")
+        return button
+
+    def _check_overlaps(self):
+        zones = self.zones
+        for i, a in enumerate(zones):
+            for j in range(i + 1, len(zones)):
+                b = zones[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    self.errors.append(f"zones {self.numbers[i]} '{a[5]}' and {self.numbers[j]} '{b[5]}' overlap; "
+                                       f"touches in the overlap always go to zone {self.numbers[i]}")
+
+    def _check_gaps(self):
+        """Warn about uncovered cells inside the layout's bounding box"""
+        xs = sorted({zone[0] for zone in self.zones} | {zone[2] for zone in self.zones})
+        ys = sorted({zone[1] for zone in self.zones} | {zone[3] for zone in self.zones})
+        gaps = []
+        for y1, y2 in zip(ys, ys[1:]):
+            for x1, x2 in zip(xs, xs[1:]):
+                if not any(zone[0] <= x1 < zone[2] and zone[1] <= y1 < zone[3] for zone in self.zones):
+                    gaps.append((x1, y1, x2, y2))
+        for gap in gaps[:MAX_REPORTED_GAPS]:
+            self.warnings.append(f"gap: no zone covers {list(gap)}")
+        if len(gaps) > MAX_REPORTED_GAPS:
+            area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in gaps)
+            share = area * 100 / ((xs[-1] - xs[0]) * (ys[-1] - ys[0]))
+            self.warnings.append(f"gap: {len(gaps) - MAX_REPORTED_GAPS} more uncovered cells; "
+                                 f"{share:.1f}% of the layout is in gaps")
+
+    def _check_names(self):
+        seen = set()
+        for zone in self.zones:
+            if zone[5] in seen:
+                self.warnings.append(f"name '{zone[5]}' is used by more than one zone; captures and the "
+                                     "control channel can't tell them apart")
+            seen.add(zone[5])
+
+    def table(self):
+        """Binary zone table the firmware loads with zone_table.load_zone_table"""
+        return encode_zone_table(self.kind, self.zones)
+
+    def overlay(self):
+        """Rendering data for touchscreen_overlay.py, with rects scaled to 0-1 of the layout's bounds"""
+        left = min(zone[0] for zone in self.zones)
+        top = min(zone[1] for zone in self.zones)
+        width = max(zone[2] for zone in self.zones) - left
+        height = max(zone[3] for zone in self.zones) - top
+        zones = []
+        for x1, y1, x2, y2, code, name in self.zones:
+            rect = [(x1 - left) / width, (y1 - top) / height, (x2 - left) / width, (y2 - top) / height]
+            if self.swap_xy:
+                rect = [rect[1], rect[0], rect[3], rect[2]]
+            zones.append({"name": name, "label": describe(code, self.kind),
+                          "rect": [round(value, 6) for value in rect], "touch": [x1, y1, x2, y2]})
+        return {"layout": self.name, "kind": self.kind_name, "swap_xy": self.swap_xy, "zones": zones}
+
+
+def parse_number(value):
+    if isinstance(value, bool):
+        raise TypeError("expected a number")
+    if isinstance(value, str):
+        return int(value, 0)
+    if isinstance(value, int):
+        return value
+    raise TypeError(f"expected a number, not {value!r}")
+
+
+def describe(code, kind):
+    if kind == KIND_BUTTONS:
+        return f"button {code}"
+    return zone_reports.describe_code(code)
+
+
+def print_findings(layout):
+    for warning in layout.warnings:
+        print(f"{layout.path}: warning: {warning}", file=sys.stderr)
+    for error in layout.errors:
+        print(f"{layout.path}: error: {error}", file=sys.stderr)
+
+
+def write_outputs(layout, output_dir=OUTPUT_DIR):
+    """Write the board table and overlay data; returns the table's path"""
+    os.makedirs(output_dir, exist_ok=True)
+    table_path = os.path.join(output_dir, layout.name + TABLE_EXTENSION)
+    with open(table_path, "wb") as f:
+        f.write(layout.table())
+    with open(os.path.join(output_dir, layout.name + OVERLAY_EXTENSION), "w") as f:
+        json.dump(layout.overlay(), f)
+    return table_path
+
+
+def compile_layout(path, output_dir=OUTPUT_DIR, strict=False):
+    """Check one layout and write its outputs; returns the table's path, or None if it failed"""
+    try:
+        layout = Layout(path)
+    except LayoutError as e:
+        print(e, file=sys.stderr)
+        return None
+    print_findings(layout)
+    if layout.errors or (strict and layout.warnings):
+        return None
+    return write_outputs(layout, output_dir)
+
+
+def layout_paths(layout_dir=LAYOUT_DIR):
+    return sorted(glob.glob(os.path.join(layout_dir, "*.json")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check zone layouts and compile them into firmware tables")
+    parser.add_argument("layouts", nargs="*", help="layout files (default: every layouts/*.json)")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="directory for the .zones and .overlay.json files")
+    parser.add_argument("--strict", action="store_true", help="treat warnings, e.g. gaps, as errors")
+    parser.add_argument("--check", action="store_true", help="only check the layouts, write nothing")
+    args = parser.parse_args()
+
+    failed = False
+    for path in args.layouts or layout_paths():
+        try:
+            layout = Layout(path)
+        except LayoutError as e:
+            print(e, file=sys.stderr)
+            failed = True
+            continue
+        print_findings(layout)
+        if layout.errors or (args.strict and layout.warnings):
+            failed = True
+        elif args.check:
+            print(f"{path}: {len(layout.zones)} zones OK")
+        else:
+            table_path = write_outputs(layout, args.output)
+            print(f"{path}: {len(layout.zones)} zones -> {table_path} ({os.path.getsize(table_path)} bytes)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,3 @@
+# Shared touchscreen firmware library. CircuitPython puts /lib on sys.path, so
+# the entry scripts import it as "touchscreen"; desktop tools add lib/ to the
+# path themselves. build_mpy.py precompiles it to .mpy for faster boots.
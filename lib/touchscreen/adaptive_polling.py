@@ -0,0 +1,125 @@
+import time
+
+from .timing import MONOTONIC, NS_PER_SECOND, get_clock, ms, now_ns, sleep_ns, ticks_elapsed
+
+try:
+    import alarm
+except ImportError:
+    alarm = None
+
+STATE_ACTIVE = 0  # A contact is down
+STATE_WARM = 1    # Recently released; another touch is likely
+STATE_IDLE = 2
+STATE_NAMES = ("active", "warm", "idle")
+
+
+class AdaptivePolling:
+    """Picks the touchscreen read timeout from recent activity
+
+    A blocking read returns as soon as a report arrives, so a long idle
+    timeout never delays the first contact; it only cuts how often the loop
+    wakes up with nothing to do. Short timeouts are used while a contact is
+    down so TOUCH_TIMEOUT and hold releases are noticed promptly.
+    """
+
+    def __init__(self, active_timeout_ms=20, warm_timeout_ms=100, idle_timeout_ms=1000, idle_after=ms(2000)):
+        self.active_timeout_ms = active_timeout_ms
+        self.warm_timeout_ms = warm_timeout_ms
+        self.idle_timeout_ms = idle_timeout_ms
+        self.idle_after = idle_after
+        self._base_timeouts = (active_timeout_ms, warm_timeout_ms)
+
+        self.state = STATE_IDLE
+        self.time_in_state = [0, 0, 0]
+        self.wakeups = [0, 0, 0]
+        self.reports = 0
+
+        now = now_ns()
+        self._state_since = now
+        self._last_activity = now
+
+    def set_report_interval(self, interval_ms):
+        """Match the timeouts to the endpoint's polling interval (bInterval)
+
+        A contact that is down reports at most once per interval, so a
+        shorter active timeout only wakes the loop between two reports.
+        Two intervals leaves room for one missed poll.
+        """
+        active, warm = self._base_timeouts
+        self.active_timeout_ms = max(active, 2 * interval_ms)
+        self.warm_timeout_ms = max(warm, self.active_timeout_ms)
+
+    def on_report(self, contact_active, now=None):
+        if now is None:
+            now = now_ns()
+        self.reports += 1
+        self._last_activity = now
+        self._enter(STATE_ACTIVE if contact_active else STATE_WARM, now)
+
+    def on_timeout(self, contact_active=False, now=None):
+        """Count a read that timed out with nothing to do"""
+        if now is None:
+            now = now_ns()
+        self.wakeups[self.state] += 1
+        if not contact_active and self.state == STATE_ACTIVE:
+            self._enter(STATE_WARM, now)
+
+    def timeout_ms(self, now=None):
+        if now is None:
+            now = now_ns()
+        if self.state == STATE_WARM and ticks_elapsed(now, self._last_activity) >= self.idle_after:
+            self._enter(STATE_IDLE, now)
+        if self.state == STATE_ACTIVE:
+            return self.active_timeout_ms
+        if self.state == STATE_WARM:
+            return self.warm_timeout_ms
+        return self.idle_timeout_ms
+
+    def active_time(self, now=None):
+        """Nanoseconds spent active or warm, including the current stretch"""
+        totals = self._totals(now)
+        return totals[STATE_ACTIVE] + totals[STATE_WARM]
+
+    def idle_time(self, now=None):
+        return self._totals(now)[STATE_IDLE]
+
+    def duty_cycle(self, now=None):
+        """Fraction of time spent active or warm rather than idle"""
+        totals = self._totals(now)
+        total = totals[0] + totals[1] + totals[2]
+        return (totals[STATE_ACTIVE] + totals[STATE_WARM]) / total if total else 0.0
+
+    def _enter(self, state, now):
+        if state == self.state:
+            return
+        self.time_in_state[self.state] += ticks_elapsed(now, self._state_since)
+        self.state = state
+        self._state_since = now
+
+    def _totals(self, now=None):
+        if now is None:
+            now = now_ns()
+        totals = list(self.time_in_state)
+        totals[self.state] += ticks_elapsed(now, self._state_since)
+        return totals
+
+    def print_stats(self):
+        totals = self._totals()
+        parts = []
+        for state, name in enumerate(STATE_NAMES):
+            parts.append(f"{name}={totals[state] / NS_PER_SECOND:.1f}s/{self.wakeups[state]} wakeups")
+        print(f"Polling stats: {' '.join(parts)} duty_cycle={self.duty_cycle() * 100:.1f}%")
+
+
+def idle_sleep(delay_ns):
+    """Sleep while no touchscreen is attached, in light sleep where the port supports it"""
+    # A virtual clock (replays, tests) just advances
+    if alarm and get_clock() is MONOTONIC:
+        try:
+            # TimeAlarm only takes float monotonic time; the delay itself stays integer
+            time_alarm = alarm.time.TimeAlarm(monotonic_time=time.monotonic() + delay_ns / NS_PER_SECOND)
+            alarm.light_sleep_until_alarms(time_alarm)
+            return
+        except (AttributeError, NotImplementedError, ValueError):
+            pass
+    sleep_ns(delay_ns)
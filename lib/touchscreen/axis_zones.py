@@ -0,0 +1,172 @@
+from .timing import NS_PER_MS, ms, now_ns, ticks_elapsed
+
+AXIS_X = 0
+AXIS_Y = 1
+AXIS_COUNT = 2
+AXIS_MAX = 0xFF  # Logical Maximum of the joystick axes in boot.py
+AXIS_CENTER = 0x80
+
+# Positions are quantized in quarter steps; a new level needs the touch to move
+# three quarters of a step away from the current one, so a finger resting on
+# a step boundary doesn't flip between two levels.
+_SUBSTEPS = 4
+_HYSTERESIS = 3
+
+
+class AxisZone:
+    """A screen area whose touch position drives joystick axes
+
+    h_axis and v_axis are the axes driven by the horizontal and vertical touch
+    position (None for neither). Screen Y grows downward, so a vertical fader
+    that should read maximum at the top sets invert. A spring zone returns its
+    axes to center on release, like a thumbstick; otherwise the last value
+    stays, like a volume slider.
+    """
+
+    def __init__(self, x1, y1, x2, y2, name, h_axis=None, v_axis=None, steps=32, spring=False, invert=False):
+        if steps < 2:
+            raise ValueError("An axis zone needs at least 2 steps")
+        self.x1 = x1
+        self.y1 = y1
+        self.x2 = x2
+        self.y2 = y2
+        self.name = name
+        self.h_axis = h_axis
+        self.v_axis = v_axis
+        self.steps = steps
+        self.spring = spring
+        self.invert = invert
+        self._levels = [None, None]
+
+    def contains(self, x, y):
+        return self.x1 <= x < self.x2 and self.y1 <= y < self.y2
+
+    def update(self, x, y, axis_state, now=None):
+        if self.h_axis is not None:
+            axis_state.set(self.h_axis, self._value(self._level(0, x, self.x1, self.x2)))
+        if self.v_axis is not None:
+            axis_state.set(self.v_axis, self._value(self._level(1, y, self.y1, self.y2)))
+        axis_state.poll(now)
+
+    def release(self, axis_state, now=None):
+        self._levels[0] = None
+        self._levels[1] = None
+        if not self.spring:
+            return
+        if self.h_axis is not None:
+            axis_state.set(self.h_axis, AXIS_CENTER)
+        if self.v_axis is not None:
+            axis_state.set(self.v_axis, AXIS_CENTER)
+        axis_state.poll(now)
+
+    def _level(self, index, position, low, high):
+        position = min(max(position, low), high - 1)
+        substep = (position - low) * (self.steps - 1) * _SUBSTEPS // max(high - low - 1, 1)
+        level = self._levels[index]
+        if level is None or abs(substep - level * _SUBSTEPS) >= _HYSTERESIS:
+            level = (substep + _SUBSTEPS // 2) // _SUBSTEPS
+            self._levels[index] = level
+        return level
+
+    def _value(self, level):
+        value = level * AXIS_MAX // (self.steps - 1)
+        return AXIS_MAX - value if self.invert else value
+
+
+def slider(x1, y1, x2, y2, axis, name, steps=32, invert=False):
+    """A fader along the long side of the rectangle; keeps its value on release"""
+    if x2 - x1 >= y2 - y1:
+        return AxisZone(x1, y1, x2, y2, name, h_axis=axis, steps=steps, invert=invert)
+    return AxisZone(x1, y1, x2, y2, name, v_axis=axis, steps=steps, invert=invert)
+
+
+def stick(x1, y1, x2, y2, name, steps=32):
+    """A virtual thumbstick driving X and Y that springs back to center"""
+    return AxisZone(x1, y1, x2, y2, name, h_axis=AXIS_X, v_axis=AXIS_Y, steps=steps, spring=True)
+
+
+def find_axis_zone(zones, x, y):
+    for zone in zones:
+        if zone.contains(x, y):
+            return zone
+    return None
+
+
+class AxisState:
+    """Rate-limits axis changes into the joystick's combined axes+buttons report
+
+    buttons is the HeldButtons that owns the report, so every update carries
+    the current button state. Each axis sends at most once per min_interval;
+    a newer value arriving sooner waits and replaces the older one, and goes
+    out from poll() when the interval is up. tap_reports are precompiled
+    button tap reports whose axis bytes are kept in step, so a tap doesn't
+    snap the axes back to center. While scheduler has a tap running on the
+    joystick, updates wait so they don't cut the tap short.
+    """
+
+    def __init__(self, buttons, min_interval=ms(20), tap_reports=(), scheduler=None):
+        self.buttons = buttons
+        self.min_interval = min_interval
+        self.tap_reports = tap_reports
+        self.scheduler = scheduler
+        self.updates = 0
+        self.superseded = 0
+        self._pending = [None, None]
+        self._last_sent = [None, None]
+
+    def set(self, axis, value):
+        """Queue a new axis value; poll() sends it, together with any other queued axis"""
+        if self._pending[axis] is not None:
+            self.superseded += 1
+        self._pending[axis] = value
+
+    @property
+    def busy(self):
+        return self._pending[0] is not None or self._pending[1] is not None
+
+    def poll(self, now=None):
+        """Send pending axis values whose rate limit has expired, in one report"""
+        if not self.busy:
+            return
+        if self.scheduler and self.scheduler.device_busy(self.buttons.device):
+            return
+        if now is None:
+            now = now_ns()
+        changed = False
+        report = self.buttons.report
+        for axis in range(AXIS_COUNT):
+            value = self._pending[axis]
+            if value is None:
+                continue
+            if value == report[1 + axis]:
+                self._pending[axis] = None
+                continue
+            last_sent = self._last_sent[axis]
+            if last_sent is not None and ticks_elapsed(now, last_sent) < self.min_interval:
+                continue
+            self._apply(axis, value)
+            self._pending[axis] = None
+            self._last_sent[axis] = now
+            changed = True
+        if changed:
+            self.updates += 1
+            self.buttons.send()
+
+    def timeout_ms(self, default_ms, now=None):
+        """Shorten a read timeout so a rate-limited value goes out on time"""
+        if not self.busy:
+            return default_ms
+        if now is None:
+            now = now_ns()
+        timeout = default_ms
+        for axis in range(AXIS_COUNT):
+            if self._pending[axis] is None or self._last_sent[axis] is None:
+                continue
+            remaining = self.min_interval - ticks_elapsed(now, self._last_sent[axis])
+            timeout = min(timeout, max(1, remaining // NS_PER_MS))
+        return timeout
+
+    def _apply(self, axis, value):
+        self.buttons.set_axis(axis, value)
+        for report in self.tap_reports:
+            report[1 + axis] = value
@@ -0,0 +1,125 @@
+from .adaptive_polling import idle_sleep
+from .timing import NS_PER_MS, NS_PER_SECOND, now_ns, ticks_elapsed
+
+
+class ConnectionSupervisor:
+    """Paces touchscreen rescans and tracks disconnect/reconnect events"""
+
+    def __init__(self, first_retry_delay=50 * NS_PER_MS, initial_delay=250 * NS_PER_MS,
+                 max_delay=8 * NS_PER_SECOND, backoff_factor=2, max_read_errors=3,
+                 healthy_after=5 * NS_PER_SECOND):
+        # Delays are integer nanoseconds
+        self.first_retry_delay = first_retry_delay
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff_factor = backoff_factor
+        self.max_read_errors = max_read_errors
+        # A connection counts as healthy after its first good read or this long
+        # connected; only then does losing it restart the backoff
+        self.healthy_after = healthy_after
+
+        self.connected = False
+        self.connect_count = 0
+        self.disconnect_count = 0
+        self.reconnect_count = 0
+        self.failed_scans = 0
+        self.recovered_read_errors = 0
+        self.total_downtime = 0
+
+        self._delay = initial_delay
+        self._read_errors = 0
+        self._down_since = now_ns()
+        self._connected_since = self._down_since
+        self._read_ok = False
+        self._verbose_scan = True
+
+    @property
+    def verbose_scan(self):
+        """Only print the full USB enumeration on the first scan after a state change"""
+        return self._verbose_scan
+
+    def on_connected(self):
+        """Record a connection; the backoff is only reset once it proves healthy"""
+        now = now_ns()
+        downtime = ticks_elapsed(now, self._down_since)
+        self.total_downtime += downtime
+        self.connect_count += 1
+        if self.connect_count > 1:
+            self.reconnect_count += 1
+            print(f"Touchscreen reconnected after {downtime / NS_PER_SECOND:.2f}s "
+                  f"(reconnects: {self.reconnect_count}, total downtime: {self.total_downtime / NS_PER_SECOND:.2f}s)")
+        self.connected = True
+        self._connected_since = now
+        self._read_ok = False
+        self._read_errors = 0
+        self._verbose_scan = False
+
+    def on_disconnected(self):
+        """Record a lost connection
+
+        After a healthy connection the next rescan happens almost immediately
+        and prints the full enumeration once. A connection that failed right
+        away, e.g. in set_configuration() or on its first reads, keeps the
+        backoff growing so a broken device isn't rescanned every 50ms.
+        """
+        if not self.connected:
+            return
+        now = now_ns()
+        self.connected = False
+        self.disconnect_count += 1
+        self._down_since = now
+        if self._read_ok or ticks_elapsed(now, self._connected_since) >= self.healthy_after:
+            self._delay = self.first_retry_delay
+            self._verbose_scan = True
+            print(f"Touchscreen disconnected (disconnects: {self.disconnect_count})")
+        else:
+            print(f"Touchscreen connection failed (disconnects: {self.disconnect_count})")
+
+    def on_scan_failed(self):
+        """Record a scan that found no touchscreen"""
+        if self._verbose_scan:
+            print("No touchscreen found, retrying...")
+        self.failed_scans += 1
+        self._verbose_scan = False
+
+    def on_read_ok(self):
+        """Clear the consecutive read error count after a good read"""
+        self._read_errors = 0
+        self._read_ok = True
+
+    def on_read_error(self, error):
+        """Return True if the read loop should keep the device and retry"""
+        self._read_errors += 1
+        if self._read_errors > self.max_read_errors:
+            print(f"Read error: {error} ({self._read_errors} in a row, giving up on device)")
+            return False
+        self.recovered_read_errors += 1
+        print(f"Read error: {error} (retry {self._read_errors}/{self.max_read_errors})")
+        return True
+
+    def next_delay(self):
+        """Return the delay before the next rescan and advance the backoff"""
+        delay = self._delay
+        if delay < self.initial_delay:
+            self._delay = self.initial_delay
+        else:
+            self._delay = min(delay * self.backoff_factor, self.max_delay)
+        return delay
+
+    def wait(self):
+        """Sleep until the next rescan is due; nothing is attached, so light sleep can't cost a touch"""
+        delay = self.next_delay()
+        if delay >= NS_PER_SECOND:
+            print(f"No touchscreen found, retrying in {delay / NS_PER_SECOND:.1f}s...")
+        idle_sleep(delay)
+
+    def downtime(self):
+        """Total time spent without a touchscreen, including the current outage"""
+        if self.connected:
+            return self.total_downtime
+        return self.total_downtime + ticks_elapsed(now_ns(), self._down_since)
+
+    def print_stats(self):
+        print(f"Connection stats: connects={self.connect_count} disconnects={self.disconnect_count} "
+              f"reconnects={self.reconnect_count} failed_scans={self.failed_scans} "
+              f"recovered_read_errors={self.recovered_read_errors} downtime={self.downtime() / NS_PER_SECOND:.2f}s")
@@ -0,0 +1,288 @@
+import struct
+
+from .zone_table import MACRO
+
+# Frame layout: SYNC, command, payload length, payload..., checksum
+# The checksum is the low byte of the sum of command, length and payload.
+SYNC = 0xA5
+MAX_PAYLOAD = 255
+REPLY_FLAG = 0x80
+
+CMD_PING = 0x01
+CMD_LIST_NAMES = 0x02      # payload: kind -> repeated (id, name length, name)
+CMD_GET_COUNTERS = 0x03    # reply: u32 per counter, in LIST_NAMES order
+CMD_GET_HISTOGRAM = 0x04   # payload: histogram id -> id, u32 per bucket
+CMD_GET_PARAM = 0x05       # payload: param id -> id, i32
+CMD_SET_PARAM = 0x06       # payload: param id, i32 -> id, i32
+CMD_GET_ZONE = 0x07        # payload: index -> index, 4 x u16 bounds, u16 code, name
+CMD_SET_ZONE = 0x08        # payload: index, 4 x u16 bounds, u16 code, name
+# A macro zone's code reads as zone_table.MACRO (0x4000); its chords can't
+# be read or set over the channel, and setting that code is rejected
+CMD_ERROR = 0x7F           # payload: failed command, error code
+
+KIND_PARAMS = 0
+KIND_COUNTERS = 1
+KIND_HISTOGRAMS = 2
+
+# Parameter ids are shared by every firmware so one client works with all of them
+PARAM_DEBOUNCE_TIME = 1
+PARAM_TOUCH_TIMEOUT = 2
+PARAM_REPEAT_DELAY = 3
+PARAM_HOLD_MODE = 4
+PARAM_IDLE_AFTER = 5
+PARAM_AXIS_INTERVAL = 6
+PARAM_ZONE_HYSTERESIS = 7
+
+ERR_BAD_CHECKSUM = 1
+ERR_UNKNOWN_COMMAND = 2
+ERR_BAD_ARGUMENT = 3
+
+ZONE_FORMAT = "<BHHHHH"
+ZONE_HEADER_SIZE = struct.calcsize(ZONE_FORMAT)
+
+
+def encode_frame(command, payload=b""):
+    """Build a complete frame; used by the desktop client"""
+    frame = bytearray(len(payload) + 4)
+    frame[0] = SYNC
+    frame[1] = command
+    frame[2] = len(payload)
+    frame[3:3 + len(payload)] = payload
+    frame[-1] = (command + len(payload) + sum(payload)) & 0xFF
+    return bytes(frame)
+
+
+class FrameParser:
+    """Incremental frame decoder that never allocates per byte"""
+
+    def __init__(self):
+        self.payload = bytearray(MAX_PAYLOAD)
+        self.command = 0
+        self.length = 0
+        self.checksum_ok = False
+        self._state = 0
+        self._index = 0
+        self._sum = 0
+
+    def feed(self, byte):
+        """Consume one byte; return True when a complete frame is available"""
+        state = self._state
+        if state == 0:
+            if byte == SYNC:
+                self._state = 1
+        elif state == 1:
+            self.command = byte
+            self._sum = byte
+            self._state = 2
+        elif state == 2:
+            self.length = byte
+            self._sum += byte
+            self._index = 0
+            self._state = 3 if byte else 4
+        elif state == 3:
+            self.payload[self._index] = byte
+            self._sum += byte
+            self._index += 1
+            if self._index == self.length:
+                self._state = 4
+        else:
+            self._state = 0
+            self.checksum_ok = (self._sum & 0xFF) == byte
+            return True
+        return False
+
+
+class Histogram:
+    """Power-of-two bucketed histogram; bucket i counts values below 2**i"""
+
+    def __init__(self, name, bucket_count=16):
+        self.name = name
+        self.buckets = [0] * bucket_count
+
+    def record(self, value):
+        index = int(value).bit_length()
+        if index >= len(self.buckets):
+            index = len(self.buckets) - 1
+        self.buckets[index] += 1
+
+    def reset(self):
+        for i in range(len(self.buckets)):
+            self.buckets[i] = 0
+
+
+class ControlChannel:
+    """Serves telemetry and live tuning over a secondary USB CDC data port
+
+    params is a sequence of (param_id, global_name, unit, minimum, maximum)
+    entries. Values cross the wire as integers counted in units, so a
+    nanosecond global with unit timing.NS_PER_MS is read and written in
+    milliseconds; a set outside minimum-maximum (in those units) is rejected
+    before the global changes.
+    on_change, if given, is called with the changed global's name after a set.
+    If it raises, the client gets ERR_BAD_ARGUMENT and the error stays here
+    rather than reaching the caller of poll().
+    """
+
+    def __init__(self, serial, namespace, params=(), counter_names=(), read_counters=None,
+                 histograms=(), zones_name="TOUCH_ZONES", on_change=None):
+        self.serial = serial
+        self.namespace = namespace
+        self.params = params
+        self.counter_names = counter_names
+        self.read_counters = read_counters
+        self.histograms = histograms
+        self.zones_name = zones_name
+        self.on_change = on_change
+        self.frames_handled = 0
+        self.frames_rejected = 0
+
+        self._parser = FrameParser()
+        self._rx = bytearray(64)
+        self._rx_view = memoryview(self._rx)
+        self._tx = bytearray(MAX_PAYLOAD + 4)
+        self._tx_view = memoryview(self._tx)
+
+    def poll(self):
+        """Handle whatever bytes are waiting; returns immediately if there are none"""
+        waiting = self.serial.in_waiting
+        while waiting:
+            count = self.serial.readinto(self._rx_view[:min(waiting, len(self._rx))])
+            if not count:
+                return
+            parser = self._parser
+            for i in range(count):
+                if parser.feed(self._rx[i]):
+                    self._handle_frame(parser)
+            waiting = self.serial.in_waiting
+
+    def _handle_frame(self, parser):
+        command = parser.command
+        if not parser.checksum_ok:
+            self.frames_rejected += 1
+            self._send_error(command, ERR_BAD_CHECKSUM)
+            return
+        payload = memoryview(parser.payload)[:parser.length]
+        try:
+            length = self._dispatch(command, payload)
+        except (IndexError, KeyError, TypeError, ValueError, struct.error):
+            self.frames_rejected += 1
+            self._send_error(command, ERR_BAD_ARGUMENT)
+            return
+        if length is None:
+            self.frames_rejected += 1
+            self._send_error(command, ERR_UNKNOWN_COMMAND)
+            return
+        self.frames_handled += 1
+        self._send(command | REPLY_FLAG, length)
+
+    def _dispatch(self, command, payload):
+        """Write the reply payload into the transmit buffer and return its length"""
+        tx = self._tx
+        if command == CMD_PING:
+            return 0
+        if command == CMD_LIST_NAMES:
+            return self._write_names(payload[0])
+        if command == CMD_GET_COUNTERS:
+            values = self.read_counters() if self.read_counters else ()
+            for i, value in enumerate(values):
+                struct.pack_into("<I", tx, 3 + i * 4, int(value) & 0xFFFFFFFF)
+            return len(values) * 4
+        if command == CMD_GET_HISTOGRAM:
+            histogram_id = payload[0]
+            buckets = self.histograms[histogram_id].buckets
+            tx[3] = histogram_id
+            for i, count in enumerate(buckets):
+                struct.pack_into("<I", tx, 4 + i * 4, count & 0xFFFFFFFF)
+            return 1 + len(buckets) * 4
+        if command == CMD_GET_PARAM:
+            return self._write_param(self._find_param(payload[0]))
+        if command == CMD_SET_PARAM:
+            param = self._find_param(payload[0])
+            value = struct.unpack_from("<i", payload, 1)[0]
+            if not param[3] <= value <= param[4]:
+                print(f"Control channel: {param[1]} {value} is outside {param[3]}-{param[4]}")
+                raise ValueError(value)
+            self.namespace[param[1]] = value * param[2]
+            print(f"Control channel: {param[1]} set to {self.namespace[param[1]]}")
+            self._notify(param[1])
+            return self._write_param(param)
+        if command == CMD_GET_ZONE:
+            return self._write_zone(payload[0])
+        if command == CMD_SET_ZONE:
+            index, x1, y1, x2, y2, code = struct.unpack_from(ZONE_FORMAT, payload, 0)
+            name = str(bytes(payload[ZONE_HEADER_SIZE:]), "utf-8")
+            zones = self.namespace[self.zones_name]
+            zone = (x1, y1, x2, y2, code, name)
+            if index == len(zones):
+                zones.append(zone)
+            else:
+                zones[index] = zone
+            print(f"Control channel: zone {index + 1} set to {zone}")
+            self._notify(self.zones_name)
+            return self._write_zone(index)
+        return None
+
+    def _notify(self, name):
+        if not self.on_change:
+            return
+        try:
+            self.on_change(name)
+        except Exception as e:
+            print(f"Control channel: applying {name} failed: {e}")
+            raise ValueError(name)
+
+    def _find_param(self, param_id):
+        for param in self.params:
+            if param[0] == param_id:
+                return param
+        raise KeyError(param_id)
+
+    def _write_param(self, param):
+        self._tx[3] = param[0]
+        struct.pack_into("<i", self._tx, 4, int(self.namespace[param[1]]) // param[2])
+        return 5
+
+    def _write_zone(self, index):
+        x1, y1, x2, y2, code, name = self.namespace[self.zones_name][index]
+        if isinstance(code, tuple):
+            code = MACRO
+        struct.pack_into(ZONE_FORMAT, self._tx, 3, index, x1, y1, x2, y2, code)
+        return ZONE_HEADER_SIZE + self._write_text(3 + ZONE_HEADER_SIZE, name)
+
+    def _write_names(self, kind):
+        if kind == KIND_PARAMS:
+            entries = [(param[0], param[1]) for param in self.params]
+        elif kind == KIND_COUNTERS:
+            entries = list(enumerate(self.counter_names))
+        elif kind == KIND_HISTOGRAMS:
+            entries = [(i, histogram.name) for i, histogram in enumerate(self.histograms)]
+        else:
+            raise ValueError(kind)
+        offset = 3
+        for entry_id, name in entries:
+            self._tx[offset] = entry_id
+            length = self._write_text(offset + 2, name)
+            self._tx[offset + 1] = length
+            offset += 2 + length
+        return offset - 3
+
+    def _write_text(self, offset, text):
+        encoded = text.encode("utf-8")[:MAX_PAYLOAD + 3 - offset]
+        self._tx[offset:offset + len(encoded)] = encoded
+        return len(encoded)
+
+    def _send_error(self, command, error_code):
+        self._tx[3] = command
+        self._tx[4] = error_code
+        self._send(CMD_ERROR, 2)
+
+    def _send(self, command, length):
+        tx = self._tx
+        tx[0] = SYNC
+        tx[1] = command
+        tx[2] = length
+        checksum = command + length
+        for i in range(3, 3 + length):
+            checksum += tx[i]
+        tx[3 + length] = checksum & 0xFF
+        self.serial.write(self._tx_view[:length + 4])
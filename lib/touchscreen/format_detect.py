@@ -0,0 +1,280 @@
+import json
+
+from .profile import PROFILE_PATH, read16
+from .timing import NS_PER_MS, ticks_elapsed
+
+# Touch report format detection. Feed the reports of a guided corner touch
+# (top-left, top-right, bottom-left, bottom-right) to FormatDetector and it
+# picks the byte layout whose decoded corners look like a touchscreen: values
+# in range, corners forming a rectangle in the prompted order, and steady
+# coordinates while a finger rests on each corner. The winning layout is saved
+# as a profile (see profile.py) that the firmware loads at startup.
+#
+# Diagnostic only: the firmware never imports this module. Runs on the board
+# (diagnostic_code.py) and on desktop Python against a captured log, from lib/:
+#   python -m touchscreen.format_detect capture.txt [--output touch_profile.json]
+
+# (name, x offset, y offset, big endian, touch state offset)
+# The four decodings diagnostic_code.py used to print side by side
+LAYOUTS = (
+    ("LE_2345", 2, 4, False, 1),
+    ("BE_2345", 2, 4, True, 1),
+    ("LE_0123", 0, 2, False, 4),
+    ("LE_1234", 1, 3, False, 0),
+)
+
+CORNERS = ("Top-Left", "Top-Right", "Bottom-Left", "Bottom-Right")
+
+STROKE_GAP = 200 * NS_PER_MS  # No reports for this long ends a corner touch
+MIN_STROKE_SAMPLES = 3  # Shorter strokes are bounces and don't count as a corner
+MAX_STROKE_SAMPLES = 32  # Samples kept per corner; enough for a stable median
+LOGICAL_MAX = 0x7FFF  # Digitizers report signed 16-bit logical ranges
+MIN_SPAN = 256  # Corners closer than this on either axis are not a real touch pattern
+MIN_SCORE = 0.5
+
+CAPTURE_PREFIX = "R "  # Capture log lines: "R <ms> <hex bytes>"
+
+
+def _median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+
+def _spread(values, center):
+    """Median absolute deviation; ignores the odd stray release report"""
+    return _median([abs(value - center) for value in values])
+
+
+class _Candidate:
+    """Running per-corner samples for one layout"""
+
+    def __init__(self, name, x_offset, y_offset, big_endian, touch_offset):
+        self.name = name
+        self.x_offset = x_offset
+        self.y_offset = y_offset
+        self.big_endian = big_endian
+        self.touch_offset = touch_offset
+        self.min_length = max(x_offset + 2, y_offset + 2, touch_offset + 1)
+        self.xs = []
+        self.ys = []
+        self.samples = 0
+        self.out_of_range = 0
+        self.corners = []  # (x, y, x spread, y spread) per finished corner, None if no samples
+
+    def add(self, data):
+        if len(data) < self.min_length or not data[self.touch_offset]:
+            return
+        x = read16(data, self.x_offset, self.big_endian)
+        y = read16(data, self.y_offset, self.big_endian)
+        self.samples += 1
+        if x > LOGICAL_MAX or y > LOGICAL_MAX:
+            self.out_of_range += 1
+        if len(self.xs) < MAX_STROKE_SAMPLES:
+            self.xs.append(x)
+            self.ys.append(y)
+
+    def close_stroke(self):
+        if self.xs:
+            x = _median(self.xs)
+            y = _median(self.ys)
+            self.corners.append((x, y, _spread(self.xs, x), _spread(self.ys, y)))
+        else:
+            self.corners.append(None)
+        self.discard_stroke()
+
+    def discard_stroke(self):
+        self.xs = []
+        self.ys = []
+
+    def score(self):
+        """Return (score, swap_xy, (left, right, top, bottom)); score is 0..1"""
+        if len(self.corners) < len(CORNERS) or None in self.corners or not self.samples:
+            return 0.0, False, None
+        range_score = 1.0 - self.out_of_range / self.samples
+        best = (0.0, False, None)
+        for swap_xy in (False, True):
+            h, v = (1, 0) if swap_xy else (0, 1)
+            fit = self._rectangle_fit(h, v)
+            if fit and range_score * fit[0] > best[0]:
+                best = (range_score * fit[0], swap_xy, fit[1])
+        return best
+
+    def _rectangle_fit(self, h, v):
+        """Monotonicity and stability with axis h as screen X and v as screen Y"""
+        tl, tr, bl, br = self.corners
+        top = tr[h] - tl[h]
+        bottom = br[h] - bl[h]
+        left = bl[v] - tl[v]
+        right = br[v] - tr[v]
+        # Moving right must change X the same way on both rows, likewise for Y
+        if top * bottom <= 0 or left * right <= 0:
+            return None
+        span_h = (abs(top) + abs(bottom)) / 2
+        span_v = (abs(left) + abs(right)) / 2
+        if span_h < MIN_SPAN or span_v < MIN_SPAN:
+            return None
+        skew = ((abs(tl[h] - bl[h]) + abs(tr[h] - br[h])) / (2 * span_h)
+                + (abs(tl[v] - tr[v]) + abs(bl[v] - br[v])) / (2 * span_v))
+        monotonicity = max(0.0, 1.0 - skew)
+        jitter = 0.0
+        for corner in self.corners:
+            jitter += corner[2 + h] / span_h + corner[2 + v] / span_v
+        stability = max(0.0, 1.0 - 10 * jitter / (2 * len(self.corners)))
+        bounds = ((tl[h] + bl[h]) // 2, (tr[h] + br[h]) // 2,
+                  (tl[v] + tr[v]) // 2, (bl[v] + br[v]) // 2)
+        return monotonicity * stability, bounds
+
+
+class FormatDetector:
+    """Scores every candidate layout incrementally as reports stream in
+
+    Call feed() with each report and its tick time, and poll() while reads
+    time out so the last corner closes without waiting for another touch.
+    Logs without timestamps can call end_stroke() between corners instead.
+    """
+
+    def __init__(self):
+        self.candidates = [_Candidate(*layout) for layout in LAYOUTS]
+        self.corner = 0
+        self.scores = {}
+        self.profile = None
+        self._stroke_reports = 0
+        self._last_report = None
+
+    @property
+    def done(self):
+        return self.corner >= len(CORNERS)
+
+    @property
+    def current_corner(self):
+        return None if self.done else CORNERS[self.corner]
+
+    def feed(self, data, now):
+        """Add one report; return True once every corner has been touched"""
+        if self.poll(now):
+            return True
+        self._stroke_reports += 1
+        self._last_report = now
+        for candidate in self.candidates:
+            candidate.add(data)
+        return False
+
+    def poll(self, now):
+        if self._last_report is not None and ticks_elapsed(now, self._last_report) > STROKE_GAP:
+            self.end_stroke()
+        return self.done
+
+    def end_stroke(self):
+        if self.done or not self._stroke_reports:
+            return
+        counted = self._stroke_reports >= MIN_STROKE_SAMPLES
+        for candidate in self.candidates:
+            if counted:
+                candidate.close_stroke()
+            else:
+                candidate.discard_stroke()
+        self._stroke_reports = 0
+        self._last_report = None
+        if counted:
+            self.corner += 1
+            if self.done:
+                self._decide()
+
+    def _decide(self):
+        best_score = 0.0
+        for candidate in self.candidates:
+            score, swap_xy, bounds = candidate.score()
+            self.scores[candidate.name] = score
+            if score > best_score and score >= MIN_SCORE:
+                best_score = score
+                self.profile = {
+                    "layout": candidate.name,
+                    "x_offset": candidate.x_offset,
+                    "y_offset": candidate.y_offset,
+                    "big_endian": candidate.big_endian,
+                    "touch_offset": candidate.touch_offset,
+                    "swap_xy": swap_xy,
+                    "left": bounds[0],
+                    "right": bounds[1],
+                    "top": bounds[2],
+                    "bottom": bounds[3],
+                    "score": round(score, 3),
+                }
+
+    def print_scores(self):
+        for name, score in sorted(self.scores.items(), key=lambda item: -item[1]):
+            print(f"  {name}: {score:.3f}")
+        if self.profile:
+            print(f"Detected layout {self.profile['layout']}"
+                  f"{' (X/Y swapped)' if self.profile['swap_xy'] else ''}")
+        else:
+            print(f"No layout scored above {MIN_SCORE}; touch each corner and hold still")
+
+
+def save_profile(profile, path=PROFILE_PATH):
+    """Write the profile; return False if the filesystem is read-only"""
+    try:
+        with open(path, "w") as f:
+            json.dump(profile, f)
+        return True
+    except OSError:
+        return False
+
+
+def capture_line(now, data):
+    """One capture log line for a raw report, read back by read_capture"""
+    return f"{CAPTURE_PREFIX}{now // NS_PER_MS} {' '.join(f'{b:02x}' for b in data)}"
+
+
+def read_capture(lines):
+    """Yield (tick time, report) for every capture line; other console output is skipped"""
+    for line in lines:
+        # The board prints "." on idle reads, which can run into the next line
+        line = line.strip().lstrip(".")
+        if not line.startswith(CAPTURE_PREFIX):
+            continue
+        fields = line[len(CAPTURE_PREFIX):].split()
+        try:
+            now = int(fields[0]) * NS_PER_MS
+            data = bytes(int(field, 16) for field in fields[1:])
+        except (IndexError, ValueError):
+            continue
+        yield now, data
+
+
+def detect_from_log(lines):
+    """Run detection over capture log lines"""
+    detector = FormatDetector()
+    now = 0
+    for now, data in read_capture(lines):
+        if detector.feed(data, now):
+            break
+    detector.poll(now + STROKE_GAP + 1)
+    return detector
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Detect the touch report format from a captured corner-touch log")
+    parser.add_argument("log", help="console capture from diagnostic_code.py")
+    parser.add_argument("--output", help=f"write the detected profile here (copy it to the board as {PROFILE_PATH})")
+    args = parser.parse_args()
+
+    with open(args.log) as f:
+        detector = detect_from_log(f)
+    if not detector.done:
+        print(f"Log only covers {detector.corner} of {len(CORNERS)} corners")
+        return 1
+    detector.print_scores()
+    if not detector.profile:
+        return 1
+    print(json.dumps(detector.profile))
+    if args.output:
+        save_profile(detector.profile, args.output)
+        print(f"Saved {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
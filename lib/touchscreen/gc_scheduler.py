@@ -0,0 +1,84 @@
+import gc
+
+from .timing import NS_PER_MS, NS_PER_SECOND, NS_PER_US, now_ns, ticks_diff, ticks_elapsed
+
+
+class GCScheduler:
+    """Keeps garbage collection out of active touches by collecting in idle windows"""
+
+    def __init__(self, threshold=None, idle_alloc_bytes=2048, idle_interval_ns=5 * NS_PER_SECOND, histogram=None):
+        self.idle_alloc_bytes = idle_alloc_bytes
+        self.idle_interval_ns = idle_interval_ns
+
+        self.collections = 0
+        self.total_gc_ns = 0
+        self.max_gc_ns = 0
+        self.last_gc_ns = 0
+        self.mem_free = None
+        self.min_mem_free = None
+        # Optional control_channel.Histogram of collection times in microseconds
+        self.histogram = histogram
+
+        self._active = False
+        self._alloc_after_gc = 0
+        self._last_collect_time = now_ns()
+
+        self.collect()
+        # Automatic collection stays on as a backstop, but only after a large
+        # allocation burst; normal collection happens in idle()
+        if threshold is None and self.mem_free is not None:
+            threshold = self.mem_free // 4
+        if threshold and hasattr(gc, "threshold"):
+            gc.threshold(threshold)
+            print(f"GC threshold set to {threshold} bytes")
+
+    def set_active(self, active):
+        """Hold off idle() collections while a contact is down
+
+        Automatic collection is never disabled: with it off the board raises
+        MemoryError instead of collecting once the heap fills, and a long hold
+        still allocates (each report's memoryview slice, nanosecond ticks past
+        the small-int range). The high threshold keeps it rare mid-contact.
+        """
+        self._active = active
+
+    def idle(self):
+        """Collect if enough garbage has built up; call when no touch is active"""
+        if self._active:
+            return False
+        now = now_ns()
+        if hasattr(gc, "mem_alloc"):
+            due = gc.mem_alloc() - self._alloc_after_gc >= self.idle_alloc_bytes
+        else:
+            due = False
+        if not due and ticks_elapsed(now, self._last_collect_time) < self.idle_interval_ns:
+            return False
+        self.collect()
+        return True
+
+    def collect(self):
+        """Run a timed collection and record heap telemetry"""
+        start = now_ns()
+        gc.collect()
+        end = now_ns()
+        duration = ticks_diff(end, start)
+        self._last_collect_time = end
+        self.collections += 1
+        self.last_gc_ns = duration
+        self.total_gc_ns += duration
+        if duration > self.max_gc_ns:
+            self.max_gc_ns = duration
+        if self.histogram:
+            self.histogram.record(duration // NS_PER_US)
+        if hasattr(gc, "mem_free"):
+            self.mem_free = gc.mem_free()
+            if self.min_mem_free is None or self.mem_free < self.min_mem_free:
+                self.min_mem_free = self.mem_free
+        if hasattr(gc, "mem_alloc"):
+            self._alloc_after_gc = gc.mem_alloc()
+
+    def print_stats(self):
+        average_ms = self.total_gc_ns / self.collections / NS_PER_MS if self.collections else 0
+        print(f"GC stats: collections={self.collections} avg={average_ms:.2f}ms "
+              f"max={self.max_gc_ns / NS_PER_MS:.2f}ms last={self.last_gc_ns / NS_PER_MS:.2f}ms "
+              f"mem_free={self.mem_free} min_mem_free={self.min_mem_free}")
@@ -0,0 +1,162 @@
+from .joystick import BUTTON_COUNT, BUTTON_OFFSET, JOYSTICK_REPORT_ID, joystick_report
+
+KEYBOARD_REPORT_LENGTH = 8
+MAX_HELD_KEYS = 6
+
+# Modifier usages in the keyboard page; held like any other key but reported as bits
+FIRST_MODIFIER_KEYCODE = 0xE0
+LAST_MODIFIER_KEYCODE = 0xE7
+
+
+class HeldKeyboard:
+    """Tracks the set of held keys and mirrors it in one preallocated keyboard report"""
+
+    def __init__(self, device):
+        self.device = device
+        self.held = set()
+        self.report = bytearray(KEYBOARD_REPORT_LENGTH)
+
+    def press(self, keycodes):
+        if self._press(keycodes):
+            self._send()
+
+    def release(self, keycodes):
+        if self._release(keycodes):
+            self._send()
+
+    def replace(self, released, pressed):
+        """Release some keys and press others in one report, so nothing looks let go in between"""
+        changed = self._release(released)
+        if self._press(pressed) or changed:
+            self._send()
+
+    def release_all(self):
+        if self.held:
+            self.held.clear()
+            self._send()
+
+    def _press(self, keycodes):
+        changed = False
+        for keycode in keycodes:
+            if keycode in self.held:
+                continue
+            if keycode < FIRST_MODIFIER_KEYCODE and self._key_count() >= MAX_HELD_KEYS:
+                print(f"Cannot hold keycode 0x{keycode:02x} - {MAX_HELD_KEYS} keys already held")
+                continue
+            self.held.add(keycode)
+            changed = True
+        return changed
+
+    def _release(self, keycodes):
+        changed = False
+        for keycode in keycodes:
+            if keycode in self.held:
+                self.held.remove(keycode)
+                changed = True
+        return changed
+
+    def _key_count(self):
+        count = 0
+        for keycode in self.held:
+            if keycode < FIRST_MODIFIER_KEYCODE:
+                count += 1
+        return count
+
+    def _send(self):
+        report = self.report
+        modifiers = 0
+        slot = 2
+        for keycode in self.held:
+            if FIRST_MODIFIER_KEYCODE <= keycode <= LAST_MODIFIER_KEYCODE:
+                modifiers |= 1 << (keycode - FIRST_MODIFIER_KEYCODE)
+            else:
+                report[slot] = keycode
+                slot += 1
+        report[0] = modifiers
+        while slot < KEYBOARD_REPORT_LENGTH:
+            report[slot] = 0
+            slot += 1
+        _send_report(self.device, report)
+
+
+class HeldButtons:
+    """Tracks held joystick buttons and the axes in one preallocated joystick report
+
+    The report is the state: press and release flip bitmask bits in place,
+    and each call that changes something sends one report with every held
+    button, so chords reach the host together.
+    """
+
+    def __init__(self, device, button_count=BUTTON_COUNT, report_id=JOYSTICK_REPORT_ID):
+        self.device = device
+        self.button_count = button_count
+        self.report = joystick_report((), button_count, report_id)
+
+    def press(self, buttons):
+        if self._press(buttons):
+            _send_report(self.device, self.report)
+
+    def release(self, buttons):
+        if self._release(buttons):
+            _send_report(self.device, self.report)
+
+    def replace(self, released, pressed):
+        """Release some buttons and press others in one report, so nothing looks let go in between"""
+        changed = self._release(released)
+        if self._press(pressed) or changed:
+            _send_report(self.device, self.report)
+
+    def _press(self, buttons):
+        report = self.report
+        changed = False
+        for button_num in buttons:
+            if not 1 <= button_num <= self.button_count:
+                print(f"ERROR: Invalid button number {button_num}, must be 1-{self.button_count}")
+                continue
+            index = BUTTON_OFFSET + ((button_num - 1) >> 3)
+            bit = 1 << ((button_num - 1) & 7)
+            if not report[index] & bit:
+                report[index] |= bit
+                changed = True
+        return changed
+
+    def _release(self, buttons):
+        report = self.report
+        changed = False
+        for button_num in buttons:
+            if not 1 <= button_num <= self.button_count:
+                continue
+            index = BUTTON_OFFSET + ((button_num - 1) >> 3)
+            bit = 1 << ((button_num - 1) & 7)
+            if report[index] & bit:
+                report[index] &= ~bit
+                changed = True
+        return changed
+
+    def release_all(self):
+        report = self.report
+        changed = False
+        for index in range(BUTTON_OFFSET, len(report)):
+            if report[index]:
+                report[index] = 0
+                changed = True
+        if changed:
+            _send_report(self.device, report)
+
+    def is_held(self, button_num):
+        return bool(self.report[BUTTON_OFFSET + ((button_num - 1) >> 3)] & (1 << ((button_num - 1) & 7)))
+
+    def set_axis(self, axis, value):
+        """Set axis 0 (X) or 1 (Y); it goes out with the next report"""
+        self.report[1 + axis] = value
+
+    def send(self):
+        """Send the current buttons and axes"""
+        _send_report(self.device, self.report)
+
+
+def _send_report(device, report):
+    try:
+        device.send_report(report)
+    except Exception as e:
+        print(f"Error sending held key report: {e}")
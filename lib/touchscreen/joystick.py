@@ -0,0 +1,58 @@
+# Joystick report layout shared by boot.py, which declares it to the host,
+# and the firmware, which fills it in: [report ID, X, Y, button bitmask...],
+# button N in bit (N-1) % 8 of bitmask byte (N-1) // 8.
+
+BUTTON_COUNT = 32  # A multiple of 8, up to 248; boot.py reads it, so reset the board after changing it
+JOYSTICK_REPORT_ID = 4
+AXIS_CENTER = 0x80
+BUTTON_OFFSET = 3  # First bitmask byte, after the report ID and both axes
+
+
+def joystick_report_length(button_count=BUTTON_COUNT):
+    """Report length in bytes, including the report ID"""
+    return BUTTON_OFFSET + button_count // 8
+
+
+def joystick_descriptor(button_count=BUTTON_COUNT, report_id=JOYSTICK_REPORT_ID):
+    """HID report descriptor for an X/Y joystick with button_count buttons"""
+    if button_count % 8 or not 8 <= button_count <= 248:
+        raise ValueError(f"Button count {button_count} must be a multiple of 8 from 8 to 248")
+    return bytes((
+        0x05, 0x01,        # Usage Page (Generic Desktop Ctrls)
+        0x09, 0x04,        # Usage (Joystick)
+        0xA1, 0x01,        # Collection (Application)
+        0x85, report_id,   #   Report ID
+
+        # X and Y axes, driven by axis zones in code_fixed.py (0x80 = center)
+        0x05, 0x01,        #   Usage Page (Generic Desktop Ctrls)
+        0x09, 0x30,        #   Usage (X)
+        0x09, 0x31,        #   Usage (Y)
+        0x15, 0x00,        #   Logical Minimum (0)
+        0x26, 0xFF, 0x00,  #   Logical Maximum (255)
+        0x75, 0x08,        #   Report Size (8)
+        0x95, 0x02,        #   Report Count (2)
+        0x81, 0x02,        #   Input (Data,Var,Abs)
+
+        # One bit per button; whole bytes, so no padding field is needed
+        0x05, 0x09,        #   Usage Page (Button)
+        0x19, 0x01,        #   Usage Minimum (Button 1)
+        0x29, button_count,  # Usage Maximum (Button N)
+        0x15, 0x00,        #   Logical Minimum (0)
+        0x25, 0x01,        #   Logical Maximum (1)
+        0x75, 0x01,        #   Report Size (1)
+        0x95, button_count,  # Report Count (N)
+        0x81, 0x02,        #   Input (Data,Var,Abs)
+
+        0xC0,              # End Collection
+    ))
+
+
+def joystick_report(buttons=(), button_count=BUTTON_COUNT, report_id=JOYSTICK_REPORT_ID):
+    """A new report with the axes centered and the given buttons down"""
+    report = bytearray(joystick_report_length(button_count))
+    report[0] = report_id
+    report[1] = AXIS_CENTER
+    report[2] = AXIS_CENTER
+    for button_num in buttons:
+        report[BUTTON_OFFSET + ((button_num - 1) >> 3)] |= 1 << ((button_num - 1) & 7)
+    return report
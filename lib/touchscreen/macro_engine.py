@@ -0,0 +1,187 @@
+from .timing import NS_PER_MS, now_ns, ticks_diff
+
+# Keyboard report modifier bits (byte 0 of the boot keyboard report)
+MOD_LEFT_CTRL = 0x01
+MOD_LEFT_SHIFT = 0x02
+MOD_LEFT_ALT = 0x04
+MOD_LEFT_GUI = 0x08
+MOD_RIGHT_CTRL = 0x10
+MOD_RIGHT_SHIFT = 0x20
+MOD_RIGHT_ALT = 0x40
+MOD_RIGHT_GUI = 0x80
+
+KEYBOARD_REPORT_LENGTH = 8
+MAX_CHORD_KEYS = 6
+
+
+class Macro:
+    """A precompiled run of HID reports, each with an offset from the start in nanoseconds"""
+
+    def __init__(self, name, device, offsets, reports, release_report):
+        self.name = name
+        self.device = device
+        self.offsets = tuple(offsets)
+        self.reports = tuple(reports)
+        self.release_report = release_report
+        self.duration = self.offsets[-1] if self.offsets else 0
+
+
+def keyboard_report(chord):
+    """Build the boot keyboard report for a (modifiers, keycode, ...) chord"""
+    keys = chord[1:]
+    if len(keys) > MAX_CHORD_KEYS:
+        raise ValueError(f"Chord has more than {MAX_CHORD_KEYS} keys")
+    report = bytearray(KEYBOARD_REPORT_LENGTH)
+    report[0] = chord[0]
+    for i, keycode in enumerate(keys):
+        report[2 + i] = keycode
+    return report
+
+
+def compile_keyboard_macro(name, device, chords, hold_ns=50 * NS_PER_MS, gap_ns=20 * NS_PER_MS):
+    """Compile chords of (modifiers, keycode, ...) into press/release reports"""
+    release = bytearray(KEYBOARD_REPORT_LENGTH)
+    offsets = []
+    reports = []
+    offset = 0
+    for chord in chords:
+        offsets.append(offset)
+        reports.append(keyboard_report(chord))
+        offset += hold_ns
+        offsets.append(offset)
+        reports.append(release)
+        offset += gap_ns
+    return Macro(name, device, offsets, reports, release)
+
+
+def compile_tap(name, device, press_report, release_report, hold_ns=50 * NS_PER_MS):
+    """Compile a single press followed by a release after hold_ns"""
+    return Macro(name, device, (0, hold_ns),
+                 (press_report, release_report), release_report)
+
+
+class MacroScheduler:
+    """Plays macros without sleeping; call poll() from the read loop
+
+    Only one macro runs per HID device at a time, because every report is a
+    full snapshot of that device's state. Starting a macro on a busy device
+    cancels the one already running there.
+    """
+
+    def __init__(self, max_running=4):
+        self._macros = [None] * max_running
+        self._starts = [0] * max_running
+        self._steps = [0] * max_running
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+
+    def start(self, macro, now=None):
+        """Begin playing a macro; its first report goes out immediately"""
+        if now is None:
+            now = now_ns()
+        self.cancel_device(macro.device)
+        slot = self._free_slot()
+        self._macros[slot] = macro
+        self._starts[slot] = now
+        self._steps[slot] = 0
+        self.started += 1
+        self.poll(now)
+
+    def cancel(self, macro):
+        for slot in range(len(self._macros)):
+            if self._macros[slot] is macro:
+                self._cancel_slot(slot)
+
+    def cancel_device(self, device):
+        for slot in range(len(self._macros)):
+            running = self._macros[slot]
+            if running is not None and running.device is device:
+                self._cancel_slot(slot)
+
+    def cancel_all(self):
+        for slot in range(len(self._macros)):
+            if self._macros[slot] is not None:
+                self._cancel_slot(slot)
+
+    def is_running(self, macro):
+        return macro in self._macros
+
+    def device_busy(self, device):
+        for running in self._macros:
+            if running is not None and running.device is device:
+                return True
+        return False
+
+    @property
+    def busy(self):
+        for running in self._macros:
+            if running is not None:
+                return True
+        return False
+
+    def poll(self, now=None):
+        """Send every report that has come due"""
+        if now is None:
+            now = now_ns()
+        for slot in range(len(self._macros)):
+            macro = self._macros[slot]
+            if macro is None:
+                continue
+            elapsed = ticks_diff(now, self._starts[slot])
+            step = self._steps[slot]
+            offsets = macro.offsets
+            while step < len(offsets) and elapsed >= offsets[step]:
+                if not self._send(macro, macro.reports[step]):
+                    self._macros[slot] = None
+                    self.cancelled += 1
+                    break
+                step += 1
+            else:
+                self._steps[slot] = step
+                if step == len(offsets):
+                    self._macros[slot] = None
+                    self.completed += 1
+
+    def timeout_ms(self, default_ms, now=None):
+        """Shorten a read timeout so the next due report is not held up by a blocking read"""
+        if now is None:
+            now = now_ns()
+        timeout = default_ms
+        for slot in range(len(self._macros)):
+            macro = self._macros[slot]
+            if macro is None:
+                continue
+            remaining = macro.offsets[self._steps[slot]] - ticks_diff(now, self._starts[slot])
+            remaining_ms = max(1, remaining // NS_PER_MS)
+            if remaining_ms < timeout:
+                timeout = remaining_ms
+        return timeout
+
+    def _free_slot(self):
+        for slot in range(len(self._macros)):
+            if self._macros[slot] is None:
+                return slot
+        # All slots busy: drop the oldest macro
+        oldest = 0
+        for slot in range(1, len(self._starts)):
+            if ticks_diff(self._starts[slot], self._starts[oldest]) < 0:
+                oldest = slot
+        self._cancel_slot(oldest)
+        return oldest
+
+    def _cancel_slot(self, slot):
+        macro = self._macros[slot]
+        self._macros[slot] = None
+        self.cancelled += 1
+        # Only release if something may still be held down
+        if self._steps[slot] > 0:
+            self._send(macro, macro.release_report)
+
+    def _send(self, macro, report):
+        try:
+            macro.device.send_report(report)
+            return True
+        except Exception as e:
+            print(f"Error sending macro '{macro.name}': {e}")
+            return False
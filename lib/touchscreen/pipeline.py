@@ -0,0 +1,155 @@
+# Streaming touch pipeline. An entry script lines up stages (decode, filter,
+# zone lookup, action) and feeds every touchscreen report through them. All
+# state lives in the stages, created once at startup, and the report travels
+# as the pipeline's one touch.Contact record, so a report allocates nothing
+# beyond what a stage's own work needs. The same stages run on the board and
+# on desktop Python, where the replay farm drives them through the scripts.
+#
+# Stages declare __slots__. CPython enforces them; CircuitPython accepts and
+# ignores them, so stages also set every attribute in __init__ to keep their
+# attribute tables from growing while reports are handled.
+
+from .control_channel import Histogram
+from .timing import NS_PER_US, now_ns, ticks_diff
+from .touch import Contact, decode_report_into
+
+
+class Stage:
+    """One step of a pipeline
+
+    process(contact) returns False to stop the report at this stage, e.g.
+    a filter dropping it. reset() forgets any contact in progress and
+    releases whatever it holds; when a contact ends the pipeline calls it
+    on every stage, last stage first, so actions let go before the stages
+    that feed them.
+    """
+
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+    def process(self, contact):
+        return True
+
+    def reset(self):
+        pass
+
+
+class Pipeline:
+    """Feeds reports through stages in order, with an optional per-stage timing hook
+
+    timing is called as timing(stage_index, elapsed_ns) after each stage
+    that ran; StageTimings keeps a histogram per stage for the control
+    channel. Without a hook, feed() never reads the clock between stages.
+    """
+
+    __slots__ = ("stages", "contact", "timing")
+
+    def __init__(self, stages, timing=None):
+        self.stages = tuple(stages)
+        self.contact = Contact()
+        self.timing = timing
+
+    def feed(self, report, now=None):
+        """Run one report through the stages; returns the shared contact record"""
+        contact = self.contact
+        contact.report = report
+        contact.time = now_ns() if now is None else now
+        if self.timing:
+            self._feed_timed(contact)
+        else:
+            for stage in self.stages:
+                if not stage.process(contact):
+                    break
+        contact.report = None
+        return contact
+
+    def _feed_timed(self, contact):
+        timing = self.timing
+        index = 0
+        for stage in self.stages:
+            start = now_ns()
+            passed = stage.process(contact)
+            timing(index, ticks_diff(now_ns(), start))
+            if not passed:
+                break
+            index += 1
+
+    def reset(self):
+        """End the current contact: every stage forgets it and the contact is up"""
+        for stage in reversed(self.stages):
+            stage.reset()
+        self.contact.down = False
+        self.contact.zone = None
+
+
+class StageTimings:
+    """Timing hook that records each stage's time in a "<stage>_us" Histogram"""
+
+    __slots__ = ("histograms",)
+
+    def __init__(self, stages):
+        self.histograms = tuple(Histogram(stage.name + "_us") for stage in stages)
+
+    def __call__(self, index, elapsed_ns):
+        self.histograms[index].record(elapsed_ns // NS_PER_US)
+
+
+class DecodeStage(Stage):
+    """Decodes the report into contact.touched, x and y; decoder is a profile.TouchDecoder or None"""
+
+    __slots__ = ("decoder",)
+
+    def __init__(self, decoder=None, name="decode"):
+        super().__init__(name)
+        self.decoder = decoder
+
+    def process(self, contact):
+        decode_report_into(contact.report, contact, self.decoder)
+        return True
+
+
+class ContactFilter(Stage):
+    """Passes touched reports on and ends the contact on the first untouched one
+
+    Touched reports stamp contact.touch_time, which the read loop compares
+    with its touch timeout. An untouched report while the contact is down
+    calls on_release, which is expected to reset the pipeline; untouched
+    reports never reach the later stages.
+    """
+
+    __slots__ = ("on_release",)
+
+    def __init__(self, on_release, name="filter"):
+        super().__init__(name)
+        self.on_release = on_release
+
+    def process(self, contact):
+        if contact.touched:
+            contact.touch_time = contact.time
+            return True
+        if contact.down:
+            self.on_release()
+        return False
+
+
+class ZoneStage(Stage):
+    """Sets contact.zone to the index of the touched zone, or None, through a touch.ZoneTracker"""
+
+    __slots__ = ("tracker",)
+
+    def __init__(self, tracker, name="zone"):
+        super().__init__(name)
+        self.tracker = tracker
+
+    def process(self, contact):
+        if contact.touched:
+            contact.zone = self.tracker.find(contact.x, contact.y)
+        else:
+            contact.zone = None
+            self.tracker.reset()
+        return True
+
+    def reset(self):
+        self.tracker.reset()
@@ -0,0 +1,93 @@
+# Decoder profiles written by format_detect.py. The firmware only needs this
+# module; the detector itself is diagnostic-only and never imported at boot.
+
+from .touch import Contact
+
+PROFILE_PATH = "touch_profile.json"
+
+
+def read16(data, offset, big_endian):
+    if big_endian:
+        return (data[offset] << 8) | data[offset + 1]
+    return data[offset] | (data[offset + 1] << 8)
+
+
+class TouchDecoder:
+    """Decodes reports with a detected profile, scaling the touched corners onto bounds"""
+
+    def __init__(self, profile, bounds):
+        self.layout = profile["layout"]
+        self.x_offset = profile["x_offset"]
+        self.y_offset = profile["y_offset"]
+        self.big_endian = profile["big_endian"]
+        self.touch_offset = profile["touch_offset"]
+        self.swap_xy = profile["swap_xy"]
+        self.min_length = max(self.x_offset + 2, self.y_offset + 2, self.touch_offset + 1)
+        self.left = profile["left"]
+        self.top = profile["top"]
+        self.x_span = profile["right"] - self.left
+        self.y_span = profile["bottom"] - self.top
+        if not self.x_span or not self.y_span:
+            raise ValueError("Touch profile has an empty calibration range")
+        self.x_min, self.y_min, self.x_max, self.y_max = bounds
+        self._decoded = Contact()
+
+    def decode(self, data):
+        """Return (touched, x, y)"""
+        self.decode_into(data, self._decoded)
+        return self._decoded.touched, self._decoded.x, self._decoded.y
+
+    def decode_into(self, data, contact):
+        """Set contact.touched, x and y without building a tuple"""
+        if len(data) < self.min_length:
+            contact.touched = False
+            contact.x = 0
+            contact.y = 0
+            return
+        a = read16(data, self.x_offset, self.big_endian)
+        b = read16(data, self.y_offset, self.big_endian)
+        if self.swap_xy:
+            a, b = b, a
+        x = self.x_min + (a - self.left) * (self.x_max - self.x_min) // self.x_span
+        y = self.y_min + (b - self.top) * (self.y_max - self.y_min) // self.y_span
+        contact.touched = data[self.touch_offset] > 0
+        contact.x = min(max(x, self.x_min), self.x_max - 1)
+        contact.y = min(max(y, self.y_min), self.y_max - 1)
+
+
+def zone_bounds(zones):
+    """Bounding box (x1, y1, x2, y2) of a TOUCH_ZONES table"""
+    return (min(zone[0] for zone in zones), min(zone[1] for zone in zones),
+            max(zone[2] for zone in zones), max(zone[3] for zone in zones))
+
+
+def load_profile(path=PROFILE_PATH):
+    """Return the saved profile, or None if there isn't a usable one"""
+    try:
+        f = open(path)
+    except OSError:
+        return None
+    # Only pay for importing json on boards that have a profile
+    import json
+    try:
+        with f:
+            return json.load(f)
+    except OSError:
+        return None
+    except ValueError as e:
+        print(f"Ignoring unreadable touch profile {path}: {e}")
+        return None
+
+
+def load_decoder(zones, path=PROFILE_PATH):
+    """TouchDecoder for the saved profile, or None to use the built-in decoding"""
+    profile = load_profile(path)
+    if not profile:
+        return None
+    try:
+        decoder = TouchDecoder(profile, zone_bounds(zones))
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"Ignoring invalid touch profile {path}: {e}")
+        return None
+    print(f"Loaded touch profile {path}: {decoder.layout}{' (X/Y swapped)' if decoder.swap_xy else ''}")
+    return decoder
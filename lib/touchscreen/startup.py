@@ -0,0 +1,37 @@
+import gc
+
+from .timing import NS_PER_MS, now_ns, ticks_diff
+
+
+class StartupTimer:
+    """Measures cold start: code start to ready, to the first key, and the heap left
+
+    Create it before the entry script's other imports so their load time is
+    counted. CircuitPython's tick clock starts at power-on, so now_ns() at
+    each mark is also the time since boot; on desktop Python it isn't.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.started = now_ns()
+        self.ready_ms = 0
+        self.first_key_ms = 0
+        self.mem_free = None
+
+    def ready(self):
+        """Mark the end of startup, just before the read loop"""
+        now = now_ns()
+        self.ready_ms = ticks_diff(now, self.started) // NS_PER_MS
+        gc.collect()
+        if hasattr(gc, "mem_free"):
+            self.mem_free = gc.mem_free()
+        print(f"{self.name} ready in {self.ready_ms}ms ({now // NS_PER_MS}ms since boot), "
+              f"mem_free={self.mem_free}")
+
+    def first_key(self):
+        """Mark the first key or button sent; later calls do nothing"""
+        if self.first_key_ms:
+            return
+        now = now_ns()
+        self.first_key_ms = max(1, ticks_diff(now, self.started) // NS_PER_MS)
+        print(f"{self.name} first key {self.first_key_ms}ms after start ({now // NS_PER_MS}ms since boot)")
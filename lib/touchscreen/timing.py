@@ -0,0 +1,104 @@
+import time
+
+# All firmware timers use integer nanosecond ticks. Float time.monotonic()
+# loses resolution after days of uptime on CircuitPython; integers don't.
+NS_PER_US = 1_000
+NS_PER_MS = 1_000_000
+NS_PER_SECOND = 1_000_000_000
+
+# Ticks wrap at this period; differences are taken modulo the period so every
+# comparison stays correct across the wrap.
+TICKS_PERIOD = 1 << 64
+_TICKS_MAX = TICKS_PERIOD - 1
+_TICKS_HALFPERIOD = TICKS_PERIOD // 2
+
+
+class MonotonicClock:
+    """The board's tick counter; what every timer reads unless set_clock() swaps it"""
+
+    def now_ns(self):
+        return time.monotonic_ns() & _TICKS_MAX
+
+    def sleep_ns(self, delay_ns):
+        if delay_ns > 0:
+            time.sleep(delay_ns / NS_PER_SECOND)
+
+
+class VirtualClock:
+    """Clock that only moves when told to; sleeping advances it instantly
+
+    Lets replays and tests run debounce, timeout and repeat logic over hours
+    of captured touches in a fraction of the time.
+    """
+
+    def __init__(self, start=0):
+        self.ticks = start & _TICKS_MAX
+
+    def now_ns(self):
+        return self.ticks
+
+    def sleep_ns(self, delay_ns):
+        if delay_ns > 0:
+            self.advance(delay_ns)
+
+    def advance(self, delta):
+        self.ticks = (self.ticks + delta) & _TICKS_MAX
+        return self.ticks
+
+    def advance_to(self, ticks):
+        """Move forward to ticks; a time already passed leaves the clock alone"""
+        if ticks_diff(ticks, self.ticks) > 0:
+            self.ticks = ticks & _TICKS_MAX
+        return self.ticks
+
+
+MONOTONIC = MonotonicClock()
+_clock = MONOTONIC
+
+
+def set_clock(clock):
+    """Make every timer read clock (None restores the real one); returns the previous clock"""
+    global _clock
+    previous = _clock
+    _clock = clock or MONOTONIC
+    return previous
+
+
+def get_clock():
+    return _clock
+
+
+def now_ns():
+    return _clock.now_ns()
+
+
+def sleep_ns(delay_ns):
+    _clock.sleep_ns(delay_ns)
+
+
+def ms(milliseconds):
+    """Integer ticks for a duration in milliseconds"""
+    return int(milliseconds * NS_PER_MS)
+
+
+def ticks_add(ticks, delta):
+    """Ticks delta nanoseconds after (or before, if negative) ticks"""
+    return (ticks + delta) & _TICKS_MAX
+
+
+def ticks_diff(end, start):
+    """Signed nanoseconds from start to end, correct across wraparound"""
+    diff = (end - start) & _TICKS_MAX
+    if diff >= _TICKS_HALFPERIOD:
+        diff -= TICKS_PERIOD
+    return diff
+
+
+def ticks_elapsed(now, then):
+    """Nanoseconds since an earlier tick; more than half a period reads as half a period"""
+    diff = ticks_diff(now, then)
+    return diff if diff >= 0 else _TICKS_HALFPERIOD
+
+
+def ticks_expired(now, deadline):
+    return ticks_diff(now, deadline) >= 0
@@ -0,0 +1,113 @@
+# Built-in report decoding and zone lookup shared by every entry script
+
+from .zone_table import ZoneTable
+
+# Touchscreen coordinate range the zone tables are laid out in
+SCREEN_WIDTH = 3800
+SCREEN_HEIGHT = 3800
+
+
+class Contact:
+    """The touch a report describes, in one record that is reused for every report
+
+    Decoding fills in touched, x and y; the pipeline stages (pipeline.py)
+    add the report's time, its zone, the time of the last touched report
+    and whether the contact counts as down.
+    """
+
+    __slots__ = ("report", "time", "touched", "x", "y", "zone", "touch_time", "down")
+
+    def __init__(self):
+        self.report = None
+        self.time = 0
+        self.touched = False
+        self.x = 0
+        self.y = 0
+        self.zone = None
+        self.touch_time = 0
+        self.down = False
+
+
+def decode_report_into(data, contact, decoder=None):
+    """Set contact.touched, x and y from a report; decoder is a profile.TouchDecoder, if one was saved"""
+    if decoder:
+        decoder.decode_into(data, contact)
+        return
+    if len(data) < 6:
+        contact.touched = False
+        contact.x = 0
+        contact.y = 0
+        return
+    
+    x = data[2] | (data[3] << 8)
+    y = data[4] | (data[5] << 8)
+    
+    if x > SCREEN_WIDTH:
+        x = int((x / 4096.0) * SCREEN_WIDTH)
+    if y > SCREEN_HEIGHT:
+        y = int((y / 3072.0) * SCREEN_HEIGHT)
+    contact.touched = data[1] > 0
+    contact.x = x
+    contact.y = y
+
+
+_parsed = Contact()
+
+
+def parse_touchscreen_report(data, decoder=None):
+    """Return (touched, x, y); decoder is a profile.TouchDecoder, if one was saved"""
+    decode_report_into(data, _parsed, decoder)
+    return _parsed.touched, _parsed.x, _parsed.y
+
+
+def find_touch_zone(zones, x, y):
+    """Index of the first (x1, y1, x2, y2, ...) zone containing the point, or None"""
+    if isinstance(zones, ZoneTable):
+        return zones.find(x, y)
+    for index, zone in enumerate(zones):
+        if zone[0] <= x < zone[2] and zone[1] <= y < zone[3]:
+            return index
+    return None
+
+
+class ZoneTracker:
+    """Zone lookup with boundary hysteresis for a contact that is already down
+
+    Each zone gets a sticky rectangle, grown by up to margin units on every
+    side, computed once from the zone table. While the contact stays inside
+    the sticky rectangle of its current zone it keeps that zone without a
+    table scan, so a finger resting on a line between two zones can't flip
+    between them; it has to move clearly into the neighbour. Call reset()
+    on release and rebuild() after the zone table changes.
+    """
+
+    def __init__(self, zones, margin=40):
+        self.zones = zones
+        self.margin = margin
+        self.current = None
+        self.sticky = []
+        self.rebuild()
+
+    def rebuild(self):
+        """Recompute the sticky rectangles from the zone table and margin"""
+        sticky = []
+        for zone in self.zones:
+            x1, y1, x2, y2 = zone[0], zone[1], zone[2], zone[3]
+            # Small zones get a proportionally smaller margin so they stay reachable
+            margin = min(self.margin, (x2 - x1) // 4, (y2 - y1) // 4)
+            sticky.append((x1 - margin, y1 - margin, x2 + margin, y2 + margin))
+        self.sticky = sticky
+        self.current = None
+
+    def find(self, x, y):
+        """Zone index for the contact at (x, y), or None"""
+        current = self.current
+        if current is not None:
+            x1, y1, x2, y2 = self.sticky[current]
+            if x1 <= x < x2 and y1 <= y < y2:
+                return current
+        self.current = find_touch_zone(self.zones, x, y)
+        return self.current
+
+    def reset(self):
+        self.current = None
@@ -0,0 +1,110 @@
+import usb.core
+import adafruit_usb_host_descriptors
+
+from .timing import NS_PER_MS
+
+HID_CLASS = 0x03
+
+# HID class request SET_IDLE (HID 1.11 section 7.2.4): host to device, class, interface
+HID_SET_IDLE_REQUEST_TYPE = 0x21
+HID_SET_IDLE = 0x0A
+IDLE_UNIT_NS = 4 * NS_PER_MS  # SET_IDLE durations count 4ms steps, 255 at most
+
+SPEED_HIGH = 3  # usb.core speed value for high-speed devices, where bInterval is an exponent
+
+
+class HIDEndpoint:
+    """The touchscreen's interrupt IN endpoint, as its descriptors describe it"""
+
+    def __init__(self, address, interface, max_packet_size, interval_ms):
+        self.address = address
+        self.interface = interface
+        self.max_packet_size = max_packet_size  # Bytes per read, including extra high-bandwidth transactions
+        self.interval_ms = interval_ms  # How often the host polls it, so the fastest the panel can report
+
+
+def endpoint_interval_ms(b_interval, high_speed=False):
+    """Polling interval in whole milliseconds from an interrupt endpoint's bInterval"""
+    if high_speed:
+        # 2^(bInterval-1) microframes of 125us
+        return max(1, (1 << (max(1, min(b_interval, 16)) - 1)) // 8)
+    return max(1, b_interval)
+
+
+def set_idle(device, endpoint, idle_ns=0, verbose=True):
+    """Ask the panel to send a report only when it changes, or every idle_ns when it doesn't
+
+    0 means only on change; any other period rounds down to the 4ms units
+    on the wire but never to 0, which would mean the opposite. The request
+    is optional in the HID spec and plenty of panels stall it; reading works
+    the same either way, so a failure is reported and otherwise ignored.
+    Returns True if accepted.
+    """
+    duration = min(255, max(1, idle_ns // IDLE_UNIT_NS)) if idle_ns > 0 else 0
+    try:
+        device.ctrl_transfer(HID_SET_IDLE_REQUEST_TYPE, HID_SET_IDLE, duration << 8, endpoint.interface, None)
+        if verbose:
+            print(f"  SET_IDLE accepted ({duration * IDLE_UNIT_NS // NS_PER_MS}ms)")
+        return True
+    except usb.core.USBError as e:
+        if verbose:
+            print(f"  SET_IDLE not supported: {e}")
+        return False
+
+
+def find_touchscreen_and_endpoint(verbose=True):
+    """Return (device, HIDEndpoint) for the first HID input endpoint, or (None, None)"""
+    if verbose:
+        print("Scanning for USB devices...")
+    device_count = 0
+    
+    for device in usb.core.find(find_all=True):
+        device_count += 1
+        try:
+            if verbose:
+                print(f"Device {device_count}: VID:{device.idVendor:04x} PID:{device.idProduct:04x}")
+                if hasattr(device, 'product') and device.product:
+                    print(f"  Product: {device.product}")
+            
+            config_descriptor = adafruit_usb_host_descriptors.get_configuration_descriptor(device, 0)
+            i = 0
+            touchscreen_interface = None
+            
+            while i < len(config_descriptor):
+                descriptor_len = config_descriptor[i]
+                descriptor_type = config_descriptor[i + 1]
+                
+                if descriptor_type == adafruit_usb_host_descriptors.DESC_INTERFACE:
+                    interface_class = config_descriptor[i + 5]
+                    interface_subclass = config_descriptor[i + 6]
+                    interface_protocol = config_descriptor[i + 7]
+                    if verbose:
+                        print(f"  Interface: Class={interface_class:02x} Sub={interface_subclass:02x} Proto={interface_protocol:02x}")
+                    
+                    if interface_class == HID_CLASS:
+                        if verbose:
+                            print("  -> Found HID interface!")
+                        touchscreen_interface = config_descriptor[i + 2]
+                        
+                elif descriptor_type == adafruit_usb_host_descriptors.DESC_ENDPOINT and touchscreen_interface is not None:
+                    endpoint_address = config_descriptor[i + 2]
+                    if endpoint_address & 0x80:  # Input endpoint
+                        # wMaxPacketSize: size in bits 0-10, extra transactions per microframe in bits 11-12
+                        w_max_packet_size = config_descriptor[i + 4] | (config_descriptor[i + 5] << 8)
+                        max_packet_size = (w_max_packet_size & 0x7FF) * (1 + ((w_max_packet_size >> 11) & 0x03))
+                        high_speed = getattr(device, "speed", None) == SPEED_HIGH
+                        interval_ms = endpoint_interval_ms(config_descriptor[i + 6], high_speed)
+                        endpoint = HIDEndpoint(endpoint_address, touchscreen_interface, max_packet_size, interval_ms)
+                        print(f"  -> Found input endpoint: {endpoint_address:02x}, packet size: {max_packet_size}, "
+                              f"interval: {interval_ms}ms")
+                        return device, endpoint
+                        
+                i += descriptor_len
+        except Exception as e:
+            if verbose:
+                print(f"Error checking device {device_count}: {e}")
+            continue
+    
+    if verbose:
+        print(f"Scanned {device_count} devices, no suitable touchscreen found")
+    return None, None
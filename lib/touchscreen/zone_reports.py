@@ -0,0 +1,75 @@
+from .macro_engine import KEYBOARD_REPORT_LENGTH, keyboard_report
+
+# Zone codes with this bit set are Consumer page usages (sent on the consumer
+# control device) rather than keyboard keycodes. The low 15 bits are the usage.
+CONSUMER = 0x8000
+CONSUMER_REPORT_ID = 5
+CONSUMER_USAGE_MAX = 0x3FF  # Must match Logical/Usage Maximum in boot.py
+
+# Consumer page usages (HID Usage Tables, Consumer Page 0x0C)
+CONSUMER_SCAN_NEXT_TRACK = CONSUMER | 0xB5
+CONSUMER_SCAN_PREVIOUS_TRACK = CONSUMER | 0xB6
+CONSUMER_STOP = CONSUMER | 0xB7
+CONSUMER_PLAY_PAUSE = CONSUMER | 0xCD
+CONSUMER_MUTE = CONSUMER | 0xE2
+CONSUMER_VOLUME_INCREMENT = CONSUMER | 0xE9
+CONSUMER_VOLUME_DECREMENT = CONSUMER | 0xEA
+CONSUMER_AL_CALCULATOR = CONSUMER | 0x192
+CONSUMER_AL_LOCAL_BROWSER = CONSUMER | 0x194
+CONSUMER_AC_SEARCH = CONSUMER | 0x221
+CONSUMER_AC_HOME = CONSUMER | 0x223
+CONSUMER_AC_BACK = CONSUMER | 0x224
+CONSUMER_AC_FORWARD = CONSUMER | 0x225
+CONSUMER_AC_REFRESH = CONSUMER | 0x227
+
+
+class ZoneReport:
+    """A zone's press and release reports, bound to the device that sends them"""
+
+    def __init__(self, name, device, press_report, release_report):
+        self.name = name
+        self.device = device
+        self.press_report = press_report
+        self.release_report = release_report
+
+    def press(self):
+        self.device.send_report(self.press_report)
+
+    def release(self):
+        self.device.send_report(self.release_report)
+
+
+def consumer_report(usage):
+    """Build the 16-bit usage array report for the consumer control device"""
+    if usage > CONSUMER_USAGE_MAX:
+        raise ValueError(f"Consumer usage 0x{usage:03x} is above 0x{CONSUMER_USAGE_MAX:03x}")
+    return bytearray((CONSUMER_REPORT_ID, usage & 0xFF, usage >> 8))
+
+
+def compile_zone_report(name, code, keyboard, consumer_control):
+    """Compile one zone code into a ZoneReport, or None if it can't be held as one report
+
+    code is a keyboard keycode, a CONSUMER usage, or a tuple of
+    (modifiers, keycode, ...) chords; only single-chord tuples compile.
+    """
+    if not code:
+        return None
+    if isinstance(code, tuple):
+        if len(code) != 1 or not keyboard:
+            return None
+        return ZoneReport(name, keyboard, keyboard_report(code[0]), bytearray(KEYBOARD_REPORT_LENGTH))
+    if code & CONSUMER:
+        if not consumer_control:
+            return None
+        return ZoneReport(name, consumer_control, consumer_report(code & ~CONSUMER), consumer_report(0))
+    if not keyboard:
+        return None
+    return ZoneReport(name, keyboard, keyboard_report((0, code)), bytearray(KEYBOARD_REPORT_LENGTH))
+
+
+def describe_code(code):
+    if isinstance(code, tuple):
+        return f"macro, {len(code)} steps"
+    if code & CONSUMER:
+        return f"consumer 0x{code & ~CONSUMER:03x}"
+    return f"0x{code:02x}"
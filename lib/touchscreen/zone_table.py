@@ -0,0 +1,201 @@
+# Binary zone tables written by layout_compiler.py from layouts/*.json. The
+# firmware maps the file straight into arrays at boot instead of building the
+# zone table from tuple literals. Everything is little-endian:
+#
+#   header     "<2sBBHHH": magic, format version, kind, zone count,
+#              names size, macros size
+#   x1 y1 x2 y2 code       one u16 column each, count entries
+#   name_end               u16 end offset of each zone's name in names
+#   names                  UTF-8 zone names, back to back
+#   macros                 per macro: chord count, then per chord: key count,
+#                          modifiers, keycodes
+#
+# A code with the MACRO bit set is MACRO | offset of its macro in macros;
+# CONSUMER codes (zone_reports.py) and plain keycodes or button numbers are
+# stored as they are.
+
+import array
+import struct
+
+MAGIC = b"TZ"
+FORMAT_VERSION = 1
+HEADER_FORMAT = "<2sBBHHH"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# What the codes of a table mean; each entry script only loads its own kind
+KIND_KEYS = 1     # Keyboard keycodes, CONSUMER usages and macros (code_keyboard.py)
+KIND_BUTTONS = 2  # Joystick button numbers (code_fixed.py)
+
+MACRO = 0x4000
+CONSUMER = 0x8000  # zone_reports.CONSUMER, repeated so code_fixed.py needn't import it
+MACRO_OFFSET_MAX = 0x3FFF
+CONSUMER_USAGE_MAX = 0x3FF  # zone_reports.CONSUMER_USAGE_MAX
+
+
+class ZoneTable:
+    """A compiled zone table that reads like a list of (x1, y1, x2, y2, code, name)
+
+    Bounds and codes live in u16 arrays, names and macros stay in the file
+    bytes and are only decoded when a zone is read. Zones set over the
+    control channel keep their name and any macro code in small overrides.
+    """
+
+    def __init__(self, data):
+        if len(data) < HEADER_SIZE:
+            raise ValueError("Zone table is truncated")
+        magic, version, kind, count, names_size, macros_size = struct.unpack_from(HEADER_FORMAT, data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Not a version {FORMAT_VERSION} zone table")
+        if len(data) != HEADER_SIZE + count * 12 + names_size + macros_size:
+            raise ValueError("Zone table is truncated")
+        self.kind = kind
+        columns = []
+        offset = HEADER_SIZE
+        for _ in range(6):
+            columns.append(array.array("H", struct.unpack_from(f"<{count}H", data, offset)))
+            offset += count * 2
+        self.x1, self.y1, self.x2, self.y2, self.codes, self.name_ends = columns
+        self.data = data
+        self.names_at = offset
+        self.macros_at = offset + names_size
+        self._names = {}
+        self._macros = {}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        for index in range(len(self.codes)):
+            yield self[index]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.codes)
+        return (self.x1[index], self.y1[index], self.x2[index], self.y2[index],
+                self.code(index), self.name(index))
+
+    def __setitem__(self, index, zone):
+        x1, y1, x2, y2, code, name = zone
+        self.codes[index] = stored_code(code, self.kind)
+        self.x1[index] = x1
+        self.y1[index] = y1
+        self.x2[index] = x2
+        self.y2[index] = y2
+        self._override(index, code, name)
+
+    def append(self, zone):
+        x1, y1, x2, y2, code, name = zone
+        self.codes.append(stored_code(code, self.kind))
+        self.x1.append(x1)
+        self.y1.append(y1)
+        self.x2.append(x2)
+        self.y2.append(y2)
+        self.name_ends.append(self.name_ends[-1] if self.name_ends else 0)
+        self._override(len(self.codes) - 1, code, name)
+
+    def _override(self, index, code, name):
+        if isinstance(code, tuple):
+            self._macros[index] = code
+        else:
+            self._macros.pop(index, None)
+        self._names[index] = name
+
+    def code(self, index):
+        """Zone code: a keycode, CONSUMER usage or button number, or a macro's chord tuple"""
+        code = self.codes[index]
+        if not code & MACRO:
+            return code
+        if index in self._macros:
+            return self._macros[index]
+        return decode_macro(self.data, self.macros_at + (code & MACRO_OFFSET_MAX))
+
+    def name(self, index):
+        if index in self._names:
+            return self._names[index]
+        start = self.name_ends[index - 1] if index else 0
+        return str(self.data[self.names_at + start:self.names_at + self.name_ends[index]], "utf-8")
+
+    def find(self, x, y):
+        """Index of the first zone containing the point, or None; same answer as touch.find_touch_zone"""
+        x1 = self.x1
+        y1 = self.y1
+        x2 = self.x2
+        y2 = self.y2
+        index = 0
+        for left in x1:
+            if left <= x < x2[index] and y1[index] <= y < y2[index]:
+                return index
+            index += 1
+        return None
+
+
+def stored_code(code, kind=KIND_KEYS):
+    """The u16 kept in the codes column for a zone code
+
+    Raises ValueError, before anything is stored, for a code the kind's
+    entry script can't send, so a bad SET_ZONE leaves the table as it was.
+    """
+    if isinstance(code, tuple):
+        return MACRO
+    # No button, keycode or CONSUMER usage (at most CONSUMER_USAGE_MAX) has bit 14 set
+    if code & MACRO:
+        raise ValueError(f"Zone code 0x{code:04x} uses the macro bit")
+    if kind == KIND_KEYS:
+        if code & CONSUMER:
+            if code & ~CONSUMER > CONSUMER_USAGE_MAX:
+                raise ValueError(f"Consumer usage 0x{code & ~CONSUMER:03x} is above 0x{CONSUMER_USAGE_MAX:03x}")
+        elif code > 0xFF:
+            raise ValueError(f"Keycode 0x{code:x} doesn't fit a keyboard report")
+    return code
+
+
+def decode_macro(data, offset):
+    """Chord tuple of the macro starting at offset"""
+    chords = []
+    for _ in range(data[offset]):
+        key_count = data[offset + 1]
+        chords.append(tuple(data[offset + 2:offset + 3 + key_count]))
+        offset += 2 + key_count
+    return tuple(chords)
+
+
+def encode_zone_table(kind, zones):
+    """Table bytes for (x1, y1, x2, y2, code, name) zones; codes may be chord tuples"""
+    columns = ([], [], [], [], [], [])
+    names = bytearray()
+    macros = bytearray()
+    for x1, y1, x2, y2, code, name in zones:
+        if isinstance(code, tuple):
+            if len(macros) > MACRO_OFFSET_MAX:
+                raise ValueError("Too many macro steps for one zone table")
+            offset = len(macros)
+            macros.append(len(code))
+            for chord in code:
+                macros.append(len(chord) - 1)
+                macros.extend(chord)
+            code = MACRO | offset
+        else:
+            code = stored_code(code, kind)
+        names.extend(name.encode("utf-8"))
+        for column, value in zip(columns, (x1, y1, x2, y2, code, len(names))):
+            column.append(value)
+    count = len(columns[0])
+    header = struct.pack(HEADER_FORMAT, MAGIC, FORMAT_VERSION, kind, count, len(names), len(macros))
+    body = b"".join(struct.pack(f"<{count}H", *column) for column in columns)
+    return header + body + bytes(names) + bytes(macros)
+
+
+def load_zone_table(path, kind):
+    """ZoneTable from path, or an empty one (with an error printed) if it is missing or for the wrong script"""
+    try:
+        with open(path, "rb") as f:
+            table = ZoneTable(f.read())
+    except OSError:
+        print(f"ERROR: No zone table {path} - build it with layout_compiler.py and copy it to the board")
+    except ValueError as e:
+        print(f"ERROR: Unreadable zone table {path}: {e}")
+    else:
+        if table.kind == kind:
+            return table
+        print(f"ERROR: Zone table {path} was compiled for another entry script")
+    return ZoneTable(encode_zone_table(kind, ()))
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+
+# Regression replay farm. Plays a directory of raw touch captures through the
+# entry scripts of two firmware versions on desktop Python and diffs the HID
+# reports each one sends. The board modules (usb_hid, usb.core, usb_cdc,
+# supervisor, adafruit_usb_host_descriptors) are replaced by in-process
+# stand-ins: the touchscreen replays the capture and every HID device records
+# what it is sent, stamped with a virtual clock (installed with
+# touchscreen.timing.set_clock) that only moves when a read or sleep waits, so
+# a replay runs as fast as the CPU allows and repeats exactly.
+#
+#   python replay_farm.py captures/                     # HEAD against the working tree
+#   python replay_farm.py captures/ --base v1.2 --head HEAD --script code_fixed.py
+#   python replay_farm.py captures/ --base ../old-checkout --jobs 8
+#
+# Captures are console logs from diagnostic_code.py ("R <ms> <hex bytes>"
+# lines, see touchscreen.format_detect). --base and --head take a directory
+# or any git revision of this repository.
+
+import argparse
+import contextlib
+import difflib
+import importlib
+import io
+import os
+import runpy
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "lib"))
+
+from touchscreen.format_detect import read_capture
+from touchscreen.timing import NS_PER_MS, NS_PER_SECOND
+
+SCRIPTS = ("code_keyboard.py", "code_fixed.py")
+CAPTURE_EXTENSIONS = (".txt", ".log")
+
+BOOT_TIME = 5 * NS_PER_SECOND  # Virtual uptime when the entry script starts
+LEAD_TIME = 500 * NS_PER_MS  # Startup to the first replayed report
+TAIL_TIME = 3 * NS_PER_SECOND  # Keep polling this long after the last report so timeouts and macros finish
+MIN_READ_WAIT = NS_PER_MS  # A timed-out read waits at least one USB frame
+MAX_PACKET_SIZE = 64
+CONSOLE_TAIL = 5  # Console lines kept for a replay that fails
+
+# Board side configuration descriptor: one HID interface with one interrupt IN endpoint
+CONFIG_DESCRIPTOR = bytes((
+    9, 2, 25, 0, 1, 1, 0, 0xA0, 50,
+    9, 4, 0, 0, 1, 0x03, 0, 0, 0,
+    7, 5, 0x81, 0x03, MAX_PACKET_SIZE, 0, 1,
+))
+
+# (name, usage page, usage) in the order boot.py enables them
+HID_DEVICES = (
+    ("joystick", 0x01, 0x04),
+    ("consumer", 0x0C, 0x01),
+    ("keyboard", 0x01, 0x06),
+    ("mouse", 0x01, 0x02),
+)
+
+STAND_IN_MODULES = ("usb", "usb.core", "usb.util", "usb_hid", "usb_cdc", "supervisor", "adafruit_usb_host_descriptors")
+
+
+class ReplayFinished(BaseException):
+    """Ends a replay; a BaseException so the entry scripts' error handling can't catch it"""
+
+
+class USBError(Exception):
+    pass
+
+
+class USBTimeoutError(USBError):
+    pass
+
+
+class VirtualClock:
+    """Replay clock, installed with touchscreen.timing.set_clock
+
+    Versions from before the injectable clock read time directly, so it
+    also stands in for time.monotonic_ns, time.monotonic and time.sleep.
+    """
+
+    def __init__(self, now=BOOT_TIME):
+        self.now = now
+
+    def now_ns(self):
+        return self.now
+
+    def sleep_ns(self, delay_ns):
+        if delay_ns > 0:
+            self.now += delay_ns
+
+    def monotonic_ns(self):
+        return self.now
+
+    def monotonic(self):
+        # Versions from before the integer tick clock use float seconds
+        return self.now / NS_PER_SECOND
+
+    def sleep(self, seconds):
+        self.now += int(seconds * NS_PER_SECOND)
+
+
+class ReplayTouchscreen:
+    """usb.core device that delivers captured reports at their recorded times"""
+
+    idVendor = 0x0EEF
+    idProduct = 0x0005
+    product = "Replay touchscreen"
+
+    def __init__(self, clock, reports):
+        self.clock = clock
+        self.reports = reports
+        self.next = 0
+        self.end = (reports[-1][0] if reports else clock.now) + TAIL_TIME
+
+    def set_configuration(self):
+        pass
+
+    def ctrl_transfer(self, request_type, request, value=0, index=0, data=None, timeout=None):
+        # The capture already holds whatever the panel sent after SET_IDLE
+        return 0
+
+    def read(self, endpoint, buffer, timeout=None):
+        clock = self.clock
+        if self.next < len(self.reports):
+            due, data = self.reports[self.next]
+            deadline = clock.now + max(MIN_READ_WAIT, (timeout or 0) * NS_PER_MS)
+            if due <= deadline:
+                clock.now = max(clock.now, due)
+                self.next += 1
+                count = min(len(data), len(buffer))
+                buffer[:count] = data[:count]
+                return count
+            clock.now = deadline
+            raise USBTimeoutError("timeout")
+        if clock.now >= self.end:
+            raise ReplayFinished()
+        clock.now += max(MIN_READ_WAIT, (timeout or 0) * NS_PER_MS)
+        raise USBTimeoutError("timeout")
+
+
+class RecordingDevice:
+    """usb_hid device that logs every report with the virtual time it was sent"""
+
+    def __init__(self, name, usage_page, usage, clock, log):
+        self.name = name
+        self.usage_page = usage_page
+        self.usage = usage
+        self._clock = clock
+        self._log = log
+
+    def send_report(self, report, report_id=None):
+        self._log.append((self._clock.now, self.name, bytes(report).hex()))
+
+
+def stand_in_modules(clock, touchscreen, log):
+    """Fresh board modules for one replay"""
+    core = types.ModuleType("usb.core")
+    core.USBError = USBError
+    core.USBTimeoutError = USBTimeoutError
+    core.find = lambda find_all=False, **kwargs: [touchscreen] if find_all else touchscreen
+    # Older versions still import usb.util without using it
+    util = types.ModuleType("usb.util")
+    usb = types.ModuleType("usb")
+    usb.__path__ = []
+    usb.core = core
+    usb.util = util
+
+    usb_hid = types.ModuleType("usb_hid")
+    usb_hid.devices = [RecordingDevice(*device, clock, log) for device in HID_DEVICES]
+    usb_hid.Device = RecordingDevice
+    usb_hid.enable = lambda devices, boot_device=0: None
+
+    usb_cdc = types.ModuleType("usb_cdc")
+    usb_cdc.console = None
+    usb_cdc.data = None
+
+    supervisor = types.ModuleType("supervisor")
+    supervisor.runtime = types.SimpleNamespace(autoreload=False)
+
+    descriptors = types.ModuleType("adafruit_usb_host_descriptors")
+    descriptors.DESC_INTERFACE = 0x04
+    descriptors.DESC_ENDPOINT = 0x05
+    descriptors.get_configuration_descriptor = lambda device, index: CONFIG_DESCRIPTOR
+
+    return {"usb": usb, "usb.core": core, "usb.util": util, "usb_hid": usb_hid, "usb_cdc": usb_cdc,
+            "supervisor": supervisor, "adafruit_usb_host_descriptors": descriptors}
+
+
+def load_capture(path):
+    """Capture reports as (virtual due time, report), shifted to start after startup"""
+    with open(path) as f:
+        reports = list(read_capture(f))
+    if not reports:
+        return []
+    shift = BOOT_TIME + LEAD_TIME - reports[0][0]
+    return [(now + shift, data) for now, data in reports]
+
+
+def _drop_firmware_modules():
+    for name in list(sys.modules):
+        if name in STAND_IN_MODULES or name == "touchscreen" or name.startswith("touchscreen."):
+            del sys.modules[name]
+
+
+def install_zone_tables(version_dir, board_dir):
+    """Compile the version's layouts into the board directory, as build_mpy.py --deploy does"""
+    compiler = os.path.join(version_dir, "layout_compiler.py")
+    if not os.path.exists(compiler):
+        return
+    namespace = runpy.run_path(compiler)
+    for path in namespace["layout_paths"](os.path.join(version_dir, "layouts")):
+        namespace["compile_layout"](path, board_dir)
+
+
+def replay(version_dir, script, capture_path):
+    """Run one entry script of one version over one capture in this process
+
+    Returns (HID reports, error or None, console tail). Reports are
+    (ms after the first touch report, device name, report hex).
+    """
+    reports = load_capture(capture_path)
+    clock = VirtualClock()
+    touchscreen = ReplayTouchscreen(clock, reports)
+    log = []
+    saved_path = list(sys.path)
+    saved_cwd = os.getcwd()
+    saved_time = (time.monotonic_ns, time.monotonic, time.sleep)
+    console = io.StringIO()
+    error = None
+    _drop_firmware_modules()
+    loaded = set(sys.modules)
+    sys.modules.update(stand_in_modules(clock, touchscreen, log))
+    # Only the replayed version is importable, not this tool's own tree
+    own = (ROOT, os.path.join(ROOT, "lib"))
+    sys.path[:] = [os.path.join(version_dir, "lib"), version_dir] + [path for path in saved_path if path not in own]
+    try:
+        importlib.import_module("touchscreen.timing").set_clock(clock)
+    except (ImportError, AttributeError):
+        time.monotonic_ns = clock.monotonic_ns
+        time.monotonic = clock.monotonic
+        time.sleep = clock.sleep
+    try:
+        # An empty working directory stands in for a board without touch_profile.json
+        with tempfile.TemporaryDirectory() as board_dir:
+            os.chdir(board_dir)
+            with contextlib.redirect_stdout(console), contextlib.redirect_stderr(console):
+                install_zone_tables(version_dir, board_dir)
+                runpy.run_path(os.path.join(version_dir, script), run_name="__main__")
+        error = "entry script returned before the capture ended"
+    except ReplayFinished:
+        pass
+    except KeyboardInterrupt:
+        raise
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        time.monotonic_ns, time.monotonic, time.sleep = saved_time
+        os.chdir(saved_cwd)
+        sys.path[:] = saved_path
+        # Forget everything the version imported so the next replay starts cold
+        for name in set(sys.modules) - loaded:
+            del sys.modules[name]
+    start = BOOT_TIME + LEAD_TIME
+    stream = [((sent - start) / NS_PER_MS, device, report) for sent, device, report in log]
+    return stream, error, console.getvalue().splitlines()[-CONSOLE_TAIL:]
+
+
+def _replay_job(job):
+    return job, replay(*job)
+
+
+def checkout(version, work_dir):
+    """Directory holding a version: used as is if it is one, else a git revision extracted into work_dir"""
+    if os.path.isdir(version):
+        return os.path.abspath(version)
+    target = os.path.join(work_dir, version.replace("/", "_"))
+    archive = subprocess.run(["git", "-C", ROOT, "archive", "--format=tar", version],
+                             capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(target, filter="data")
+    return target
+
+
+def compare(base, head, tolerance_ms):
+    """Return (status, detail) for two report streams
+
+    Reports match on device and bytes; a matched report sent more than
+    tolerance_ms earlier or later counts as a timing change.
+    """
+    base_keys = [(device, report) for _, device, report in base]
+    head_keys = [(device, report) for _, device, report in head]
+    if base_keys != head_keys:
+        matcher = difflib.SequenceMatcher(None, base_keys, head_keys, autojunk=False)
+        first = next(opcode for opcode in matcher.get_opcodes() if opcode[0] != "equal")
+        at = base[first[1]][0] if first[1] < len(base) else head[first[3]][0] if first[3] < len(head) else None
+        where = f", first at {at:.1f}ms" if at is not None else ""
+        return "DIFFERENT", f"{len(base)} -> {len(head)} reports{where}"
+    shift = max((abs(a[0] - b[0]) for a, b in zip(base, head)), default=0.0)
+    if shift > tolerance_ms:
+        return "timing", f"{len(base)} reports, max shift {shift:.1f}ms"
+    return "same", f"{len(base)} reports"
+
+
+def stream_diff(base, head, max_lines):
+    """Unified diff of two report streams, one line per report"""
+    lines = difflib.unified_diff([f"{t:10.1f}ms {device:8} {report}" for t, device, report in base],
+                                 [f"{t:10.1f}ms {device:8} {report}" for t, device, report in head],
+                                 "base", "head", n=2, lineterm="")
+    output = list(lines)
+    if len(output) > max_lines:
+        output = output[:max_lines] + [f"... {len(output) - max_lines} more lines"]
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay touch captures through two firmware versions and diff the HID output")
+    parser.add_argument("captures", help="directory of capture logs from diagnostic_code.py")
+    parser.add_argument("--base", default="HEAD", help="directory or git revision to compare against (default HEAD)")
+    parser.add_argument("--head", default=ROOT, help="directory or git revision under test (default the working tree)")
+    parser.add_argument("--script", action="append", choices=SCRIPTS, help="entry script to replay (default both)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--tolerance", type=float, default=1.0, metavar="MS",
+                        help="report time shift that still counts as the same (default 1ms)")
+    parser.add_argument("--max-diff-lines", type=int, default=40, help="diff lines printed per differing capture")
+    args = parser.parse_args()
+
+    captures = sorted(os.path.join(args.captures, name) for name in os.listdir(args.captures)
+                      if name.endswith(CAPTURE_EXTENSIONS))
+    if not captures:
+        print(f"No capture logs ({', '.join(CAPTURE_EXTENSIONS)}) in {args.captures}", file=sys.stderr)
+        return 1
+    scripts = args.script or SCRIPTS
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        try:
+            versions = {"base": checkout(args.base, work_dir), "head": checkout(args.head, work_dir)}
+        except subprocess.CalledProcessError as e:
+            print(f"git archive failed: {e.stderr.decode().strip()}", file=sys.stderr)
+            return 1
+        jobs = [(versions[label], script, capture)
+                for capture in captures for script in scripts for label in ("base", "head")]
+        started = time.monotonic()
+        results = {}
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            for job, result in pool.map(_replay_job, jobs, chunksize=max(1, len(jobs) // (8 * (args.jobs or 1)))):
+                results[job] = result
+        elapsed = time.monotonic() - started
+
+    print(f"Replayed {len(captures)} captures x {len(scripts)} scripts x 2 versions in {elapsed:.1f}s")
+    print(f"  base: {args.base}\n  head: {args.head}")
+    counts = {}
+    details = []
+    for capture in captures:
+        for script in scripts:
+            base, base_error, base_console = results[(versions["base"], script, capture)]
+            head, head_error, head_console = results[(versions["head"], script, capture)]
+            if base_error or head_error:
+                status = "ERROR"
+                detail = "; ".join(f"{label}: {error}" for label, error in
+                                   (("base", base_error), ("head", head_error)) if error)
+                console = head_console if head_error else base_console
+                details.append((capture, script, [f"  {line}" for line in console]))
+            else:
+                status, detail = compare(base, head, args.tolerance)
+                if status != "same":
+                    details.append((capture, script, stream_diff(base, head, args.max_diff_lines)))
+            counts[status] = counts.get(status, 0) + 1
+            print(f"{status:10} {os.path.basename(capture):32} {script:18} {detail}")
+
+    for capture, script, lines in details:
+        print(f"\n{os.path.basename(capture)} / {script}")
+        for line in lines:
+            print(line)
+    print("\n" + ", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+    return 1 if counts.get("DIFFERENT") or counts.get("ERROR") else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
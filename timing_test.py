@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+# Simulated-clock soak test for the integer tick timing layer.
+# Runs weeks of virtual uptime in well under a second on desktop Python:
+#   python timing_test.py   (or collect it with pytest)
+
+import contextlib
+import io
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib"))
+
+from touchscreen.connection_supervisor import ConnectionSupervisor
+from touchscreen.macro_engine import MacroScheduler, compile_tap
+from touchscreen.timing import (NS_PER_MS, NS_PER_SECOND, TICKS_PERIOD, VirtualClock, ms, set_clock, ticks_add,
+                                ticks_diff, ticks_elapsed, ticks_expired)
+
+SIMULATED_DAYS = 30
+NS_PER_DAY = 24 * 60 * 60 * NS_PER_SECOND
+
+
+class SimClock(VirtualClock):
+    """Virtual tick source that starts two days before the tick counter wraps"""
+
+    def __init__(self, start=TICKS_PERIOD - 2 * NS_PER_DAY):
+        super().__init__(start)
+        self.elapsed = 0
+
+    def advance(self, delta):
+        self.elapsed += delta
+        return super().advance(delta)
+
+
+class RecordingDevice:
+    def __init__(self, clock):
+        self.clock = clock
+        self.reports = []
+
+    def send_report(self, report):
+        self.reports.append((self.clock.elapsed, bytes(report)))
+
+
+def float32(value):
+    """Round to single precision, roughly what a CircuitPython float holds"""
+    return struct.unpack("f", struct.pack("f", value))[0]
+
+
+def test_ticks_wraparound():
+    before = TICKS_PERIOD - ms(10)
+    after = ticks_add(before, ms(30))
+    assert after == ms(20)
+    assert ticks_diff(after, before) == ms(30)
+    assert ticks_diff(before, after) == -ms(30)
+    assert ticks_elapsed(after, before) == ms(30)
+    assert ticks_expired(after, ticks_add(before, ms(30)))
+    assert not ticks_expired(after, ticks_add(before, ms(31)))
+
+
+def test_windows_stay_exact_over_days():
+    """Debounce/timeout/repeat windows measured in ticks stay exact for the whole run"""
+    clock = SimClock()
+    debounce, timeout, repeat = ms(50), ms(100), ms(500)
+    wrapped = False
+    last_change = clock.ticks
+    for _ in range(SIMULATED_DAYS * 24):
+        previous = clock.ticks
+        last_change = clock.advance(60 * 60 * NS_PER_SECOND - ms(1))
+        wrapped = wrapped or last_change < previous
+        assert ticks_elapsed(clock.advance(debounce - 1), last_change) < debounce
+        assert ticks_elapsed(clock.advance(1), last_change) >= debounce
+        assert not ticks_elapsed(clock.ticks, last_change) > timeout
+        assert ticks_elapsed(clock.advance(timeout - debounce + 1), last_change) > timeout
+        assert ticks_elapsed(clock.advance(repeat), last_change) >= repeat
+    assert wrapped, "simulation never crossed the tick wrap"
+    assert clock.elapsed > SIMULATED_DAYS * NS_PER_DAY - NS_PER_DAY
+
+
+def test_float_seconds_lose_debounce_resolution():
+    """Why ticks exist: after ten days a float can't tell 0 from 50ms apart"""
+    uptime = 10 * 24 * 60 * 60.0
+    assert float32(uptime + 0.05) - float32(uptime) != 0.05
+    now = 10 * NS_PER_DAY
+    assert ticks_diff(now + ms(50), now) == ms(50)
+
+
+def test_macro_timing_over_days():
+    """A 50ms tap fired every hour releases exactly 50ms later, across the wrap"""
+    clock = SimClock()
+    device = RecordingDevice(clock)
+    tap = compile_tap("tap", device, bytearray(b"\x01"), bytearray(b"\x00"), ms(50))
+    scheduler = MacroScheduler()
+    for _ in range(SIMULATED_DAYS * 24):
+        clock.advance(60 * 60 * NS_PER_SECOND)
+        scheduler.start(tap, clock.ticks)
+        for _ in range(12):
+            clock.advance(5 * NS_PER_MS)
+            scheduler.poll(clock.ticks)
+        assert not scheduler.busy
+    presses = device.reports[0::2]
+    releases = device.reports[1::2]
+    assert len(presses) == len(releases) == SIMULATED_DAYS * 24
+    for (pressed_at, _), (released_at, _) in zip(presses, releases):
+        assert released_at - pressed_at == ms(50)
+    assert scheduler.completed == SIMULATED_DAYS * 24
+
+
+def test_injected_clock_drives_firmware_timers():
+    """With a virtual clock installed, rescan backoff sleeps advance it instead of blocking"""
+    clock = SimClock()
+    previous = set_clock(clock)
+    try:
+        supervisor = ConnectionSupervisor()
+        expected = ConnectionSupervisor()
+        total = 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(SIMULATED_DAYS * 24 * 60 * 60 // 8):
+                supervisor.on_scan_failed()
+                supervisor.wait()
+                total += expected.next_delay()
+        assert clock.elapsed == total > SIMULATED_DAYS * NS_PER_DAY - NS_PER_DAY
+        assert supervisor.downtime() == total
+    finally:
+        set_clock(previous)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: ok")
+    print(f"Simulated {SIMULATED_DAYS} days of uptime across a tick wrap")
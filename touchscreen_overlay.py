@@ -1,11 +1,36 @@
 #!/usr/bin/env python3
 
+# Draws a layout's zones full screen from the overlay data layout_compiler.py
+# writes next to the board table, so it matches what the firmware loads.
+# A layout source is compiled first; a compiled .overlay.json is drawn as is:
+#   python touchscreen_overlay.py [layouts/keyboard.json]
+
+import json
+import os
+import sys
 import tkinter as tk
 from tkinter import ttk
 import colorsys
 
+import layout_compiler
+
+DEFAULT_LAYOUT = os.path.join(layout_compiler.LAYOUT_DIR, "keyboard.json")
+
+
+def load_overlay(path=DEFAULT_LAYOUT):
+    """Overlay data for a layout source or a compiled .overlay.json"""
+    if not path.endswith(layout_compiler.OVERLAY_EXTENSION):
+        if not layout_compiler.compile_layout(path):
+            raise SystemExit(f"Can't draw {path} until its errors are fixed")
+        name = os.path.splitext(os.path.basename(path))[0]
+        path = os.path.join(layout_compiler.OUTPUT_DIR, name + layout_compiler.OVERLAY_EXTENSION)
+    with open(path) as f:
+        return json.load(f)
+
+
 class TouchscreenOverlay:
-    def __init__(self):
+    def __init__(self, overlay):
+        self.overlay = overlay
         self.root = tk.Tk()
         self.root.title("Touchscreen Zone Overlay")
         self.fullscreen = False
@@ -32,7 +57,7 @@ class TouchscreenOverlay:
         self.add_coordinates_display()
         
     def calculate_touch_zones(self):
-        """Calculate 16 touch zones in 4x4 grid based on current canvas size"""
+        """Scale the layout's zones to the current canvas size"""
         self.root.update_idletasks()
         canvas_width = self.canvas.winfo_width()
         canvas_height = self.canvas.winfo_height()
@@ -43,37 +68,14 @@ class TouchscreenOverlay:
         if canvas_height <= 1:
             canvas_height = 768
         
-        zone_width = canvas_width // 4
-        zone_height = canvas_height // 4
-        
+        # Layout rects are fractions of the screen, already pivoted by the
+        # compiler if the layout sets "swap_xy"
         self.touch_zones = []
-        # Touch zones with actual command mappings from code_keyboard.py TOUCH_ZONES
-        # Layout matches the 4x4 grid in order: row by row, left to right
-        commands = [
-            "[", "-", "<", "Play/Pause",           # Row 0
-            "]", "=", ">", "Left Arrow",           # Row 1 
-            "Prev Song", "Home", "Up Arrow", "Down Arrow",  # Row 2
-            "Next Song", "End", "Enter", "Right Arrow"      # Row 3
-        ]
-        keycodes = [
-            0x2F, 0x2D, 0x36, 0xCD,   # Row 0
-            0x30, 0x2E, 0x37, 0x50,   # Row 1
-            0xB6, 0x4A, 0x52, 0x51,   # Row 2
-            0xB5, 0x4D, 0x28, 0x4F    # Row 3
-        ]
-        
-        for row in range(4):
-            for col in range(4):
-                x1 = col * zone_width
-                y1 = row * zone_height
-                x2 = x1 + zone_width
-                y2 = y1 + zone_height
-                
-                # Pivot: first row becomes first column
-                # Original row 0 -> column 0, original row 1 -> column 1, etc.
-                original_idx = row * 4 + col
-                pivoted_idx = col * 4 + row
-                self.touch_zones.append((x1, y1, x2, y2, keycodes[pivoted_idx], commands[pivoted_idx]))
+        for zone in self.overlay["zones"]:
+            x1, y1, x2, y2 = zone["rect"]
+            self.touch_zones.append((round(x1 * canvas_width), round(y1 * canvas_height),
+                                     round(x2 * canvas_width), round(y2 * canvas_height),
+                                     zone["label"], zone["name"]))
     
     def on_resize(self, event=None):
         """Handle window resize events"""
@@ -111,7 +113,7 @@ class TouchscreenOverlay:
             
         colors = self.generate_colors(len(self.touch_zones))
         
-        for i, (x1, y1, x2, y2, keycode, command_name) in enumerate(self.touch_zones):
+        for i, (x1, y1, x2, y2, label, command_name) in enumerate(self.touch_zones):
             color = colors[i]
             
             # Draw rectangle
@@ -163,7 +165,7 @@ class TouchscreenOverlay:
             # Draw keycode
             self.canvas.create_text(
                 center_x, center_y + font_size,
-                text=f"0x{keycode:02x}",
+                text=label,
                 fill='white',
                 font=('Arial', coord_font_size),
                 tags=f"zone_{i}"
@@ -191,7 +193,7 @@ class TouchscreenOverlay:
         """Handle mouse clicks to show which zone was clicked"""
         x, y = event.x, event.y
         if hasattr(self, 'touch_zones'):
-            for i, (x1, y1, x2, y2, keycode, command_name) in enumerate(self.touch_zones):
+            for i, (x1, y1, x2, y2, label, command_name) in enumerate(self.touch_zones):
                 if x1 <= x <= x2 and y1 <= y <= y2:
                     print(f"Clicked zone {i+1}: {command_name} at ({x}, {y})")
                     # Briefly highlight the clicked zone
@@ -224,7 +226,7 @@ class TouchscreenOverlay:
     
     def run(self):
         """Start the GUI"""
-        print("Touchscreen Zone Overlay")
+        print(f"Touchscreen Zone Overlay: {self.overlay['layout']} layout")
         print("- Move mouse to see coordinates")
         print("- Click zones to test detection")
         print("- Press F11 to toggle fullscreen")
@@ -232,5 +234,5 @@ class TouchscreenOverlay:
         self.root.mainloop()
 
 if __name__ == "__main__":
-    overlay = TouchscreenOverlay()
+    overlay = TouchscreenOverlay(load_overlay(*sys.argv[1:2]))
     overlay.run()
\ No newline at end of file
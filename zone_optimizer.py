@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+# Offline zone boundary optimizer. Takes labeled capture sessions (the zone a
+# person meant to touch plus the samples the touchscreen reported) and fits
+# the grid boundaries and a dead margin per zone that minimize wrong keys.
+# Prints accuracy before and after and the fitted layout to save over the
+# layouts/*.json file (then rebuild it with layout_compiler.py). Needs NumPy
+# (pip install numpy); the board never runs it.
+#
+#   python zone_optimizer.py --table layouts/keyboard.json captures/*.jsonl
+#   python zone_optimizer.py --table layouts/fixed.json --demo 1000000
+#
+# Capture files hold one JSON object per line:
+#   {"zone": "Enter", "samples": [[x, y], ...]}      touch coordinates
+#   {"zone": 15, "reports": ["0101c40e...", ...]}   raw reports, decoded like the
+#                                                   firmware does (--profile)
+# "zone" is a zone name or its 1-based number in the table.
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib"))
+
+from touchscreen.profile import load_decoder
+from touchscreen.touch import SCREEN_HEIGHT, SCREEN_WIDTH, parse_touchscreen_report
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MISS_COST = 0.5  # A touch ignored in a margin costs half as much as a wrong key
+MARGIN_STEP = 5
+MAX_MARGIN = 200
+MIN_ZONE_SIZE = 100  # Fitted boundaries never squeeze a row or column below this
+
+
+class Zone:
+    """One zone of a layout file; the entry is kept as written so its code survives"""
+
+    def __init__(self, entry):
+        self.rect = tuple(entry["rect"])
+        self.name = entry["name"]
+        self.entry = entry
+
+
+def load_table(path):
+    """Return (layout, zones) from a layouts/*.json file"""
+    with open(path) as f:
+        layout = json.load(f)
+    zones = [Zone(entry) for entry in layout.get("zones", ())]
+    if not zones:
+        raise ValueError(f"No zones in {path}")
+    return layout, zones
+
+
+def grid_of(zones):
+    """Column/row edges of a grid layout and each zone's (column, row) cell"""
+    x_edges = sorted({zone.rect[0] for zone in zones} | {zone.rect[2] for zone in zones})
+    y_edges = sorted({zone.rect[1] for zone in zones} | {zone.rect[3] for zone in zones})
+    cols = []
+    rows = []
+    for zone in zones:
+        x1, y1, x2, y2 = zone.rect
+        col = x_edges.index(x1)
+        row = y_edges.index(y1)
+        if x_edges[col + 1] != x2 or y_edges[row + 1] != y2:
+            raise ValueError(f"Zone '{zone.name}' spans several grid cells; only grid layouts can be fitted")
+        cols.append(col)
+        rows.append(row)
+    return np.array(x_edges), np.array(y_edges), np.array(cols), np.array(rows)
+
+
+def load_captures(paths, zones, decoder=None):
+    """Return (points, labels): an (N, 2) array of touches and each one's intended zone"""
+    by_name = {zone.name: index for index, zone in enumerate(zones)}
+    points = []
+    labels = []
+    for path in paths:
+        with open(path) as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                session = json.loads(line)
+                zone = session["zone"]
+                label = zone - 1 if isinstance(zone, int) else by_name.get(zone)
+                if label is None or not 0 <= label < len(zones):
+                    raise ValueError(f"{path}:{line_number}: unknown zone {zone!r}")
+                samples = session.get("samples", [])
+                for report in session.get("reports", ()):
+                    touched, x, y = parse_touchscreen_report(bytes.fromhex(report), decoder)
+                    if touched:
+                        samples.append((x, y))
+                points.extend(samples)
+                labels.extend([label] * len(samples))
+    return np.array(points, dtype=np.int32).reshape(-1, 2), np.array(labels, dtype=np.int32)
+
+
+def synthetic_captures(zones, count, seed=1):
+    """Touches aimed at zone centers with scatter and a downward parallax drift"""
+    rng = np.random.default_rng(seed)
+    rects = np.array([zone.rect for zone in zones])
+    labels = rng.integers(0, len(zones), count).astype(np.int32)
+    centers = (rects[:, :2] + rects[:, 2:]) / 2
+    sizes = rects[:, 2:] - rects[:, :2]
+    scatter = rng.normal(0, 0.22, (count, 2)) * sizes[labels]
+    drift = np.array([0, 0.08]) * sizes[labels]
+    points = np.rint(centers[labels] + scatter + drift).astype(np.int32)
+    return points, labels
+
+
+def classify(rects, points):
+    """Zone index for every point, first match like find_touch_zone, -1 for none"""
+    x = points[:, :1]
+    y = points[:, 1:]
+    inside = (x >= rects[:, 0]) & (x < rects[:, 2]) & (y >= rects[:, 1]) & (y < rects[:, 3])
+    return np.where(inside.any(axis=1), inside.argmax(axis=1), -1)
+
+
+def fit_edges(edges, coords, cells, limit):
+    """Move each inner edge to the split with the fewest samples on the wrong side"""
+    fitted = edges.copy()
+    last = len(edges) - 1
+    for i in range(1, last):
+        before = np.sort(coords[cells == i - 1])
+        after = np.sort(coords[cells == i])
+        if not len(before) or not len(after):
+            continue
+        candidates = np.unique(np.concatenate((before, after, edges[i:i + 1])))
+        errors = (len(before) - np.searchsorted(before, candidates)) + np.searchsorted(after, candidates)
+        best = candidates[errors.argmin()]
+        # Center the edge in the gap below the best split
+        below = np.concatenate((before[before < best], after[after < best]))
+        edge = (int(below.max()) + int(best) + 1) // 2 if len(below) else int(best)
+        fitted[i] = min(max(edge, fitted[i - 1] + MIN_ZONE_SIZE), edges[i + 1] - MIN_ZONE_SIZE)
+    # Outer edges only grow, to take in touches aimed at an edge zone
+    outer_low = coords[cells == 0]
+    outer_high = coords[cells == last - 1]
+    if len(outer_low):
+        fitted[0] = max(0, min(edges[0], int(outer_low.min())))
+    if len(outer_high):
+        fitted[last] = min(limit, max(edges[last], int(outer_high.max()) + 1))
+    return fitted
+
+
+def grid_rects(x_edges, y_edges, cols, rows):
+    return np.stack((x_edges[cols], y_edges[rows], x_edges[cols + 1], y_edges[rows + 1]), axis=1)
+
+
+def fit_margins(rects, cols, rows, points, labels):
+    """Per-zone inset from neighbouring zones that trades wrong keys for ignored touches"""
+    inner = np.stack((cols > 0, rows > 0, cols < cols.max(), rows < rows.max()), axis=1)
+    predicted = classify(rects, points)
+    candidates = np.arange(0, MAX_MARGIN + 1, MARGIN_STEP)
+    margins = np.zeros(len(rects), dtype=np.int32)
+    for zone in range(len(rects)):
+        selected = predicted == zone
+        x = points[selected, 0]
+        y = points[selected, 1]
+        x1, y1, x2, y2 = rects[zone]
+        sides = np.stack((x - x1, y - y1, x2 - 1 - x, y2 - 1 - y), axis=1)
+        # Screen edges have no neighbour to mistake a touch for
+        sides = np.where(inner[zone], sides, MAX_MARGIN + 1)
+        depth = sides.min(axis=1)
+        correct = labels[selected] == zone
+        right = np.sort(depth[correct])
+        wrong = np.sort(depth[~correct])
+        cost = (len(wrong) - np.searchsorted(wrong, candidates)) + MISS_COST * np.searchsorted(right, candidates)
+        margins[zone] = candidates[cost.argmin()]
+    insets = inner * margins[:, None]
+    return rects + insets * np.array([1, 1, -1, -1]), margins
+
+
+def accuracy(rects, points, labels):
+    predicted = classify(rects, points)
+    correct = predicted == labels
+    missed = predicted < 0
+    return correct, missed, ~correct & ~missed
+
+
+def print_accuracy(title, zones, rects, points, labels):
+    correct, missed, wrong = accuracy(rects, points, labels)
+    print(f"{title}: {correct.mean() * 100:.2f}% correct, {wrong.mean() * 100:.2f}% wrong key, "
+          f"{missed.mean() * 100:.2f}% ignored ({len(labels)} touches)")
+    counts = np.bincount(labels, minlength=len(zones))
+    wrong_by_zone = np.bincount(labels[wrong], minlength=len(zones))
+    for zone in np.argsort(-wrong_by_zone / np.maximum(counts, 1))[:3]:
+        if wrong_by_zone[zone]:
+            print(f"  worst: '{zones[zone].name}' {wrong_by_zone[zone] / counts[zone] * 100:.2f}% wrong")
+
+
+def format_table(layout, zones, rects):
+    """The layout file with fitted rects, one zone per line; margins are already inset"""
+    lines = ["{"]
+    for key, value in layout.items():
+        if key != "zones":
+            lines.append(f" {json.dumps(key)}: {json.dumps(value)},")
+    lines.append(' "zones": [')
+    entries = []
+    for zone, rect in zip(zones, rects.tolist()):
+        entries.append("  " + json.dumps(dict(zone.entry, rect=rect)))
+    lines.append(",\n".join(entries))
+    lines.append(" ]")
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def optimize(zones, points, labels):
+    """Return (fitted rects, per-zone margins) for a grid table"""
+    x_edges, y_edges, cols, rows = grid_of(zones)
+    x_edges = fit_edges(x_edges, points[:, 0], cols[labels], SCREEN_WIDTH)
+    y_edges = fit_edges(y_edges, points[:, 1], rows[labels], SCREEN_HEIGHT)
+    return fit_margins(grid_rects(x_edges, y_edges, cols, rows), cols, rows, points, labels)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit zone layout boundaries to labeled touch captures")
+    parser.add_argument("captures", nargs="*", help="JSON lines capture files")
+    parser.add_argument("--table", required=True, help="layout file to fit, e.g. layouts/keyboard.json")
+    parser.add_argument("--profile", help="touch_profile.json for decoding raw reports")
+    parser.add_argument("--demo", type=int, metavar="N", help="fit N synthetic touches instead of captures")
+    args = parser.parse_args()
+
+    if np is None:
+        print("zone_optimizer.py needs NumPy: pip install numpy", file=sys.stderr)
+        return 1
+    layout, zones = load_table(args.table)
+    if args.demo:
+        points, labels = synthetic_captures(zones, args.demo)
+    elif args.captures:
+        decoder = load_decoder([zone.rect for zone in zones], args.profile) if args.profile else None
+        points, labels = load_captures(args.captures, zones, decoder)
+    else:
+        parser.error("give capture files or --demo")
+    if not len(labels):
+        print("No touches in the captures", file=sys.stderr)
+        return 1
+
+    try:
+        rects, margins = optimize(zones, points, labels)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print_accuracy("Current table", zones, np.array([zone.rect for zone in zones]), points, labels)
+    print_accuracy("Fitted table", zones, rects, points, labels)
+    fitted = [f"'{zone.name}' {margin}" for zone, margin in zip(zones, margins.tolist()) if margin]
+    print(f"Dead margins: {', '.join(fitted) or 'none'}")
+    print(format_table(layout, zones, rects))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())